@@ -4,8 +4,11 @@ Script to add SEO header and footer sections to G2 unit HTML files.
 Follows the pattern established in Unit 11.
 """
 
+import argparse
 import re
-import sys
+from urllib.parse import quote
+
+from site_utils import add_since_argument, git_changes
 
 # Unit metadata
 UNITS = {
@@ -204,10 +207,10 @@ def create_footer_section(unit_num):
         prev_title = f'Unit {prev_unit}: {UNITS.get(prev_unit, {}).get("title", "")} (G2)'
 
     if unit_num == 20:
-        next_link = '/training/g2/G2/CSA_Unit_21_Chapter_Reviews.html'
+        next_link = '/CSA_Unit_21_Chapter_Reviews.html'
         next_title = 'Unit 21: (G2 Continued)'
     else:
-        next_link = f'/training/g2/G2/CSA_Unit_{next_unit}_Chapter_Reviews.html'
+        next_link = f'/CSA_Unit_{next_unit}_Chapter_Reviews.html'
         next_title = f'Unit {next_unit}: (G2 Continued)'
 
     return f'''    <!-- SEO-OPTIMIZED UNIT FOOTER SECTION -->
@@ -268,7 +271,7 @@ def create_footer_section(unit_num):
         <section class="study-resources">
             <h3>📚 Additional G2 Study Resources</h3>
             <ul class="resource-links">
-                <li><a href="/training/g2/G2/{unit['pdf']}" target="_blank">📄 Download Unit {unit_num} PDF Study Guide</a></li>
+                <li><a href="/{quote(unit['pdf'])}" target="_blank">📄 Download Unit {unit_num} PDF Study Guide</a></li>
                 <li><a href="/tssa-g2-exam-prep.html">← Back to TSSA G2 Exam Prep Overview</a></li>
                 <li><a href="/tssa-g2-units-index.html">Browse All G2 Training Units</a></li>
                 <li><a href="/tssa-g3-units-index.html">Review G3 Foundation Units</a></li>
@@ -326,10 +329,16 @@ def process_unit_file(unit_num):
     return True
 
 if __name__ == '__main__':
-    units = [16, 17, 18, 19, 20]
-
-    if len(sys.argv) > 1:
-        units = [int(u) for u in sys.argv[1:]]
+    parser = argparse.ArgumentParser(description='Add SEO header and footer sections to G2 unit HTML files')
+    parser.add_argument('units', nargs='*', type=int, default=[16, 17, 18, 19, 20], help='unit numbers')
+    add_since_argument(parser)
+    args = parser.parse_args()
+    units = args.units
+
+    if args.since:
+        changed, _ = git_changes(args.since)
+        units = [u for u in units if f'CSA_Unit_{u}_Chapter_Reviews.html' in changed]
+        print(f"Limiting to units changed since {args.since}: {units}")
 
     print(f"Adding SEO sections to {len(units)} units...")
     print()
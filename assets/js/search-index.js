@@ -0,0 +1,119 @@
+/* LARK Labs Search Index - Queries the prefix-sharded index built by build_search_index.py
+ *
+ * Usage: <script src="/assets/js/search-index.js" defer></script>, then
+ *   LarkSearch.search('gas valve', { phrase: true }).then(results => ...)
+ * Each result is { url, title, score }. The index has to be built and
+ * deployed with the page; a missing manifest rejects the search.
+ */
+
+const LarkSearch = (() => {
+    const INDEX_URL = '/assets/search-index/';
+    const TOKEN = /[a-z0-9]+(?:\.[0-9]+)+|[a-z0-9]+/g;
+
+    let manifestPromise = null;
+    const shardCache = {};
+
+    // Load the manifest once per page
+    const loadManifest = () => {
+        if (!manifestPromise) {
+            manifestPromise = fetch(INDEX_URL + 'manifest.json').then(res => {
+                if (!res.ok) throw new Error(`Search index unavailable (${res.status})`);
+                return res.json();
+            }).catch(error => {
+                // Let the next search retry instead of caching the failure
+                manifestPromise = null;
+                throw error;
+            });
+        }
+        return manifestPromise;
+    };
+
+    // Fetch a shard only the first time a query needs it
+    const loadShard = (manifest, prefix) => {
+        if (!Object.hasOwn(manifest.shards, prefix)) return Promise.resolve({});
+        const file = manifest.shards[prefix];
+        if (!Object.hasOwn(shardCache, prefix)) {
+            shardCache[prefix] = fetch(INDEX_URL + file).then(res => {
+                if (!res.ok) throw new Error(`Search shard ${file} unavailable (${res.status})`);
+                return res.json();
+            }).catch(error => {
+                delete shardCache[prefix];
+                throw error;
+            });
+        }
+        return shardCache[prefix];
+    };
+
+    // Expand [doc delta, count, position deltas...] into {docId: [positions]}
+    const decodePostings = (encoded) => {
+        const result = {};
+        let doc = 0;
+        let i = 0;
+        while (i < encoded.length) {
+            doc += encoded[i++];
+            const count = encoded[i++];
+            const positions = [];
+            let pos = 0;
+            for (let n = 0; n < count; n++) {
+                pos += encoded[i++];
+                positions.push(pos);
+            }
+            result[doc] = positions;
+        }
+        return result;
+    };
+
+    // Kept terms with their offset from the first kept term; stopwords are not
+    // indexed but still take up a position, as in build_search_index.py
+    const tokenize = (text, stopwords) => {
+        const terms = [];
+        let first = -1;
+        (text.toLowerCase().match(TOKEN) || []).forEach((token, index) => {
+            if (stopwords.has(token)) return;
+            if (first < 0) first = index;
+            terms.push({ term: token, offset: index - first });
+        });
+        return terms;
+    };
+
+    // Check whether the terms appear at their query offsets from a common start
+    const hasPhrase = (termPositions, offsets) => {
+        return termPositions[0].some(start =>
+            termPositions.every((positions, i) => positions.includes(start + offsets[i])));
+    };
+
+    // Search for documents containing every query term, best matches first
+    const search = async (query, { phrase = false, limit = 20 } = {}) => {
+        const manifest = await loadManifest();
+        const stopwords = new Set(manifest.stopwords);
+        const queryTerms = tokenize(query, stopwords);
+        if (queryTerms.length === 0) return [];
+        const terms = queryTerms.map(t => t.term);
+        const offsets = queryTerms.map(t => t.offset);
+
+        const prefixes = [...new Set(terms.map(t => t.slice(0, manifest.prefixLength)))];
+        const shards = {};
+        await Promise.all(prefixes.map(async prefix => {
+            shards[prefix] = await loadShard(manifest, prefix);
+        }));
+
+        const postings = terms.map(term => {
+            const shard = shards[term.slice(0, manifest.prefixLength)];
+            return Object.hasOwn(shard, term) ? decodePostings(shard[term]) : {};
+        });
+
+        const results = [];
+        for (const doc of Object.keys(postings[0])) {
+            if (!postings.every(p => Object.hasOwn(p, doc))) continue;
+            if (phrase && terms.length > 1 && !hasPhrase(postings.map(p => p[doc]), offsets)) continue;
+
+            const score = postings.reduce((sum, p) => sum + p[doc].length, 0);
+            const [path, title] = manifest.docs[doc];
+            results.push({ url: '/' + path, title, score });
+        }
+
+        return results.sort((a, b) => b.score - a.score).slice(0, limit);
+    };
+
+    return { search };
+})();
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Build-time search index for the CSA unit and code reference pages
+Tokenises headings, paragraphs and quiz questions into a positional inverted index
+split into prefix shards, so the browser only fetches the shards a query needs
+"""
+
+import argparse
+import fnmatch
+import glob
+import gzip
+import json
+import re
+import statistics
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+
+from site_utils import add_since_argument, content_hash, format_bytes, git_changes
+
+# Pages that are indexed
+INDEX_PAGES = [
+    'CSA_B149_Reference_Guide.html',
+    'B149_1_Changes.html',
+    'CSA_Unit_*.html',
+]
+
+# Where the manifest and shards are written
+INDEX_DIR = 'assets/search-index'
+
+# Number of leading token characters that pick a shard
+PREFIX_LENGTH = 2
+
+# Bump when the on-disk format changes (assets/js/search-index.js reads it)
+INDEX_VERSION = 1
+
+# Elements whose text is indexed
+TEXT_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'td', 'th', 'dt', 'dd', 'label', 'summary'}
+
+# Common words that are never worth a posting (positions still advance)
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'which', 'with',
+}
+
+# Section numbers like "4.3.2" and code names like "b149.1" stay whole
+TOKEN = re.compile(r'[a-z0-9]+(?:\.[0-9]+)+|[a-z0-9]+')
+
+# Quiz questions live in the inline question-bank script on the unit pages
+QUESTION = re.compile(r'question:\s*(["\'])((?:\\.|(?!\1).)*)\1')
+
+# Section text on the reference guide lives in template literals of HTML
+TEMPLATE_LITERAL = re.compile(r'`((?:\\.|[^`\\])*)`', re.DOTALL)
+INTERPOLATION = re.compile(r'\$\{[^}]*\}')
+
+def tokenize(text):
+    """Lowercase and split text into index tokens"""
+    return TOKEN.findall(text.lower())
+
+class PageTextParser(HTMLParser):
+    """Collect the title, indexed element text and quiz questions from a page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.blocks = []
+        self._stack = []
+        self._in_title = False
+        self._in_script = False
+        self._in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'script':
+            self._in_script = True
+        elif tag == 'style':
+            self._in_style = True
+        elif tag in TEXT_TAGS:
+            self._stack.append([])
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        elif tag == 'script':
+            self._in_script = False
+        elif tag == 'style':
+            self._in_style = False
+        elif tag in TEXT_TAGS and self._stack:
+            text = ' '.join(self._stack.pop()).strip()
+            if text:
+                self.blocks.append(text)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif self._in_script:
+            self.blocks.extend(m.group(2) for m in QUESTION.finditer(data))
+            for literal in TEMPLATE_LITERAL.finditer(data):
+                markup = INTERPOLATION.sub(' ', literal.group(1)).replace('\\`', '`')
+                if '<' in markup:
+                    self.blocks.extend(markup_blocks(markup))
+        elif not self._in_style and self._stack:
+            self._stack[-1].append(data)
+
+def markup_blocks(markup):
+    """Return the indexed text blocks of an HTML fragment"""
+    parser = PageTextParser()
+    parser.feed(markup)
+    parser.close()
+    return parser.blocks
+
+def extract_page(path):
+    """Return (title, text blocks) for one page"""
+    with open(path, 'r', encoding='utf-8') as f:
+        parser = PageTextParser()
+        parser.feed(f.read())
+        parser.close()
+    return parser.title.strip() or Path(path).stem, parser.blocks
+
+def build_index(paths):
+    """Build {token: {doc_id: [positions]}} and the document table"""
+    docs = []
+    postings = {}
+
+    for doc_id, path in enumerate(paths):
+        title, blocks = extract_page(path)
+        docs.append([path, title])
+
+        position = 0
+        for block in [title] + blocks:
+            for token in tokenize(block):
+                if token not in STOPWORDS:
+                    postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+                position += 1
+            # Gap between blocks so phrases never match across them
+            position += 1
+
+    return docs, postings
+
+def encode_postings(doc_postings):
+    """Delta-encode postings as [doc delta, count, position deltas..., ...]"""
+    encoded = []
+    last_doc = 0
+    for doc_id in sorted(doc_postings):
+        positions = doc_postings[doc_id]
+        encoded.append(doc_id - last_doc)
+        encoded.append(len(positions))
+        last_pos = 0
+        for pos in positions:
+            encoded.append(pos - last_pos)
+            last_pos = pos
+        last_doc = doc_id
+    return encoded
+
+def shard_key(token):
+    """Return the shard prefix for a token"""
+    return token[:PREFIX_LENGTH]
+
+def write_index(docs, postings, out_dir):
+    """Write the prefix shards and manifest, returns {prefix: (file, size, gzip size)}"""
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    shards = {}
+    for token in sorted(postings):
+        shards.setdefault(shard_key(token), {})[token] = encode_postings(postings[token])
+
+    # Remove shards from previous builds
+    for old in out_path.glob('shard-*.json'):
+        old.unlink()
+
+    written = {}
+    for prefix, terms in shards.items():
+        data = json.dumps(terms, separators=(',', ':')).encode('utf-8')
+        name = f"shard-{prefix}.{content_hash(data)[:8]}.json"
+        with open(out_path / name, 'wb') as f:
+            f.write(data)
+        written[prefix] = (name, len(data), len(gzip.compress(data, compresslevel=9)))
+
+    manifest = {
+        'version': INDEX_VERSION,
+        'prefixLength': PREFIX_LENGTH,
+        'stopwords': sorted(STOPWORDS),
+        'docs': docs,
+        'shards': {prefix: info[0] for prefix, info in sorted(written.items())},
+    }
+    with open(out_path / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+
+    return written
+
+def print_benchmark(build_times, written, postings):
+    """Print build time and shard size statistics"""
+    sizes = [info[1] for info in written.values()]
+    gz_sizes = [info[2] for info in written.values()]
+
+    print(f"Build time: best {min(build_times) * 1000:.1f} ms, "
+          f"mean {statistics.mean(build_times) * 1000:.1f} ms over {len(build_times)} runs")
+    print(f"Terms: {len(postings)}, shards: {len(sizes)}")
+    print(f"Shard size (raw):  total {format_bytes(sum(sizes))}, median {format_bytes(statistics.median(sizes))}, "
+          f"max {format_bytes(max(sizes))}")
+    print(f"Shard size (gzip): total {format_bytes(sum(gz_sizes))}, median {format_bytes(statistics.median(gz_sizes))}, "
+          f"max {format_bytes(max(gz_sizes))}")
+
+    print("\nLargest shards:")
+    for prefix, info in sorted(written.items(), key=lambda x: x[1][1], reverse=True)[:5]:
+        print(f"  {prefix:<3} {format_bytes(info[1]):>10} raw {format_bytes(info[2]):>10} gzip")
+
+def main():
+    """Build the search index"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', default=INDEX_DIR, help='index output directory')
+    parser.add_argument('--runs', type=int, default=1, help='build repetitions for timing')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    if args.since and (Path(args.out) / 'manifest.json').exists():
+        # The index is rebuilt whole, so only the question is whether anything changed
+        changed, deleted = git_changes(args.since)
+        if not any(fnmatch.fnmatchcase(path, pattern)
+                   for path in changed | deleted for pattern in INDEX_PAGES):
+            print(f"No indexed pages changed since {args.since} - index is up to date")
+            return
+
+    paths = []
+    for pattern in INDEX_PAGES:
+        paths.extend(sorted(glob.glob(pattern)))
+
+    print(f"Indexing {len(paths)} pages...")
+
+    build_times = []
+    for _ in range(max(1, args.runs)):
+        start = time.perf_counter()
+        docs, postings = build_index(paths)
+        build_times.append(time.perf_counter() - start)
+
+    written = write_index(docs, postings, args.out)
+
+    print(f"Index written to {args.out}/")
+    print()
+    print_benchmark(build_times, written, postings)
+
+if __name__ == "__main__":
+    main()
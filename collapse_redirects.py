@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Redirect-chain collapsing for LarkLabs.org internal links
+Compiles the netlify.toml redirect rules, resolves every internal link to its
+final target, rewrites links that go through a redirect to point straight at it,
+and flags links that only resolve through the catch-all fallback
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import re
+from urllib.parse import unquote, urlsplit
+
+from site_utils import BASE_URL, add_since_argument, git_changes, iter_publish_files
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+NETLIFY_CONFIG = 'netlify.toml'
+
+# Redirect hops followed before a chain is reported as a loop
+MAX_HOPS = 10
+
+SITE_HOST = urlsplit(BASE_URL).netloc
+
+LINK_ATTRIBUTE = re.compile(r'(\s(?:href|src)\s*=\s*)(["\'])(.*?)\2', re.IGNORECASE | re.DOTALL)
+TAG = re.compile(r'<[a-zA-Z](?:"[^"]*"|\'[^\']*\'|[^\'">])*>')
+SKIP_SCHEMES = ('mailto:', 'tel:', 'javascript:', 'data:', 'sms:')
+
+# Files considered when repointing links that fall through to the catch-all
+PUBLISHED_EXTENSIONS = ('.html', '.pdf', '.png', '.jpg', '.jpeg', '.svg', '.css', '.js', '.json')
+
+class RedirectRule:
+    """One compiled [[redirects]] entry"""
+
+    def __init__(self, rule):
+        self.source = rule['from']
+        self.to = rule['to']
+        self.status = int(rule.get('status', 301))
+        self.force = bool(rule.get('force', False))
+
+        source = urlsplit(self.source)
+        self.host = source.netloc
+        self.pattern = re.compile('^' + self._compile_path(source.path or '/') + '$')
+
+    @staticmethod
+    def _compile_path(path):
+        """Turn /a/:name/* into a regex with named groups"""
+        regex = ''
+        for part in re.split(r'(\*|:[a-zA-Z_]\w*)', path):
+            if part == '*':
+                regex += '(?P<splat>.*)'
+            elif part.startswith(':'):
+                regex += f'(?P<{part[1:]}>[^/]+)'
+            else:
+                regex += re.escape(part)
+        return regex
+
+    @property
+    def is_catch_all(self):
+        return self.source == '/*' and self.status == 200
+
+    def match(self, path):
+        """Return the substituted target for a path, or None"""
+        # Origin-specific rules (e.g. the http -> https redirect) never apply to
+        # links resolved on the live https site
+        if self.host:
+            return None
+        found = self.pattern.match(path)
+        if not found:
+            return None
+        target = self.to
+        for name, value in found.groupdict().items():
+            target = target.replace(f':{name}', value or '')
+        return target
+
+def load_rules(config_path=NETLIFY_CONFIG):
+    """Parse the redirect rules from netlify.toml, in evaluation order"""
+    with open(config_path, 'rb') as f:
+        config = tomllib.load(f)
+    return [
+        RedirectRule(rule) for rule in config.get('redirects', [])
+        if not rule.get('conditions') and not rule.get('query')
+    ]
+
+def file_for_path(path, root='.'):
+    """Return the published file a URL path is served from (relative to root), or None"""
+    relative = unquote(path).lstrip('/')
+    candidates = [relative]
+    if not relative or relative.endswith('/'):
+        candidates = [relative + 'index.html']
+    elif not posixpath.splitext(relative)[1]:
+        # Netlify serves /page from page.html and /dir from dir/index.html
+        candidates += [relative + '.html', relative + '/index.html']
+
+    # Never resolve outside the root (".." segments, symlinks)
+    real_root = os.path.realpath(root)
+    for candidate in candidates:
+        if not candidate:
+            continue
+        full_path = os.path.realpath(os.path.join(root, candidate))
+        if full_path.startswith(real_root + os.sep) and os.path.isfile(full_path):
+            return candidate
+    return None
+
+def resolve(path, rules, root='.'):
+    """Follow redirects for a site path
+
+    Returns (kind, final target, hops) where kind is one of 'file', 'redirect',
+    'proxy', 'rewrite', 'catch-all', 'missing' or 'loop'.
+    """
+    hops = 0
+    current = path
+    while hops <= MAX_HOPS:
+        exists = file_for_path(current, root) is not None
+        for rule in rules:
+            if exists and not rule.force:
+                continue
+            target = rule.match(current)
+            if target is None:
+                continue
+
+            if rule.is_catch_all:
+                return 'catch-all', target, hops
+            if rule.status in (301, 302, 303, 307, 308):
+                hops += 1
+                if urlsplit(target).netloc:
+                    return 'redirect', target, hops
+                current = target
+                break
+            return ('proxy' if urlsplit(target).netloc else 'rewrite'), target, hops
+        else:
+            if exists:
+                return ('redirect' if hops else 'file'), current, hops
+            return 'missing', current, hops
+    return 'loop', current, hops
+
+def site_path(page, url):
+    """Return the absolute site path for an internal link, or None if external"""
+    if not url or url.startswith('#') or url.lower().startswith(SKIP_SCHEMES):
+        return None
+    parts = urlsplit(url)
+    if parts.scheme and parts.scheme not in ('http', 'https'):
+        return None
+    if parts.netloc and parts.netloc != SITE_HOST:
+        return None
+    if parts.path.startswith('/'):
+        return posixpath.normpath(parts.path) + ('/' if parts.path.endswith('/') and parts.path != '/' else '')
+    base = posixpath.dirname('/' + page)
+    joined = posixpath.normpath(posixpath.join(base, parts.path or posixpath.basename(page)))
+    return joined + ('/' if parts.path.endswith('/') else '')
+
+def rewritten_url(page, original, target):
+    """Rebuild a link to point at the final target, keeping its style and suffix"""
+    parts = urlsplit(original)
+    suffix = (f'?{parts.query}' if parts.query else '') + (f'#{parts.fragment}' if parts.fragment else '')
+    if urlsplit(target).netloc:
+        return target
+    if parts.netloc or parts.path.startswith('/'):
+        return target + suffix
+    relative = posixpath.relpath(target, posixpath.dirname('/' + page))
+    return relative + ('/' if target.endswith('/') and not relative.endswith('/') else '') + suffix
+
+def build_basename_index():
+    """Map file names to the published files that carry them"""
+    index = {}
+    for path in iter_publish_files('.', PUBLISHED_EXTENSIONS):
+        index.setdefault(posixpath.basename(path), []).append('/' + path)
+    return index
+
+def suggest_target(path, basenames):
+    """Return the only published file with the same name as a dead link, or None"""
+    matches = basenames.get(posixpath.basename(path), [])
+    return matches[0] if len(matches) == 1 else None
+
+def process_page(page, rules, dry_run, basenames=None):
+    """Collapse redirected links in one page, returns (rewrites, flagged links)
+
+    With a basename index, links that only reach the catch-all are repointed at
+    the one published file with the same name, when there is exactly one.
+    """
+    with open(page, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    rewrites = []
+    flagged = []
+
+    def replace_link(match):
+        url = match.group(3)
+        path = site_path(page, url.strip())
+        if path is None:
+            return match.group(0)
+
+        kind, target, hops = resolve(path, rules)
+        if kind == 'redirect':
+            new_url = rewritten_url(page, url.strip(), target)
+            rewrites.append({'link': url, 'target': new_url, 'hops': hops})
+            return match.group(1) + match.group(2) + new_url + match.group(2)
+        if kind in ('catch-all', 'missing', 'loop'):
+            suggestion = suggest_target(path, basenames) if basenames else None
+            if suggestion and kind == 'catch-all':
+                new_url = rewritten_url(page, url.strip(), suggestion)
+                rewrites.append({'link': url, 'target': new_url, 'hops': 0, 'fallthrough': True})
+                return match.group(1) + match.group(2) + new_url + match.group(2)
+            flagged.append({'link': url, 'path': path, 'kind': kind})
+        return match.group(0)
+
+    new_content = TAG.sub(lambda tag: LINK_ATTRIBUTE.sub(replace_link, tag.group(0)), content)
+
+    if rewrites and not dry_run:
+        with open(page, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+
+    return rewrites, flagged
+
+def main():
+    """Resolve and collapse internal links across all published pages"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='report without rewriting pages')
+    parser.add_argument('--report', metavar='FILE', help='write rewrites and flagged links as JSON')
+    parser.add_argument('--fix-fallthrough', action='store_true',
+                        help='repoint catch-all links at the only published file with the same name')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    rules = load_rules()
+    pages = list(iter_publish_files('.', ('.html',)))
+    if args.since:
+        changed, _ = git_changes(args.since)
+        pages = [p for p in pages if p in changed]
+
+    print(f"Loaded {len(rules)} redirect rules from {NETLIFY_CONFIG}")
+    print(f"Checking links in {len(pages)} pages...")
+    print("-" * 80)
+
+    basenames = build_basename_index() if args.fix_fallthrough else None
+
+    report = {}
+    total_rewrites = 0
+    total_flagged = 0
+    for page in pages:
+        rewrites, flagged = process_page(page, rules, args.dry_run, basenames)
+        if rewrites or flagged:
+            report[page] = {'rewrites': rewrites, 'flagged': flagged}
+        for item in rewrites:
+            via = 'catch-all' if item.get('fallthrough') else f"{item['hops']} hops"
+            print(f"[OK] {page}: {item['link']} -> {item['target']} ({via})")
+        for item in flagged:
+            print(f"[WARN] {page}: {item['link']} falls through to {item['kind']}")
+        total_rewrites += len(rewrites)
+        total_flagged += len(flagged)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    print("-" * 80)
+    action = 'Would rewrite' if args.dry_run else 'Rewrote'
+    print(f"{action} {total_rewrites} redirected or dead-end links")
+    print(f"Flagged {total_flagged} links that only resolve through the catch-all fallback")
+
+if __name__ == "__main__":
+    main()
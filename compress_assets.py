@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Post-processing stage for LarkLabs.org
+Conservatively minifies HTML/CSS/JS and writes max-level Brotli and gzip siblings
+into the build output directory, skipping files whose content hash is unchanged
+"""
+
+import argparse
+import gzip
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from find_duplicates import load_duplicates
+from site_utils import (add_since_argument, content_hash, format_bytes, git_changes,
+                        iter_publish_files, load_cache, page_class, page_url, save_cache)
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional - gzip siblings are still written
+    brotli = None
+
+# Build output directory
+OUTPUT_DIR = 'dist'
+
+# Bump when the minifier changes so cached outputs are rebuilt
+MINIFIER_VERSION = '1'
+
+# Text files that get minified before compression
+MINIFY_EXTENSIONS = ('.html', '.css', '.js')
+
+# Text files that are only precompressed
+COMPRESS_EXTENSIONS = MINIFY_EXTENSIONS + ('.svg', '.json', '.xml', '.txt', '.webmanifest')
+
+# Everything else in the publish set is copied through unchanged
+COPY_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico', '.pdf',
+                   '.woff', '.woff2', '.mp4', '.webm')
+
+# Comments that other scripts look for (add_g2_seo.py) are never stripped
+PRESERVE_COMMENT_MARKERS = [
+    'SEO-OPTIMIZED UNIT HEADER SECTION',
+    'SEO-OPTIMIZED UNIT FOOTER SECTION',
+    'END UNIT HEADER SECTION',
+    'END UNIT FOOTER SECTION',
+    '[if ',
+    '<![endif]',
+]
+
+# HTML tokens: comments, raw text elements, tags (quoted attributes may contain '>')
+HTML_TOKEN = re.compile(
+    r'(?P<comment><!--.*?-->)'
+    r'|(?P<raw><(?P<rawtag>pre|textarea|script|style)\b(?:"[^"]*"|\'[^\']*\'|[^\'">])*>.*?</(?P=rawtag)\s*>)'
+    r'|(?P<tag><[a-zA-Z/!](?:"[^"]*"|\'[^\']*\'|[^\'">])*>)',
+    re.DOTALL | re.IGNORECASE
+)
+
+STYLE_BLOCK = re.compile(r'(<style\b[^>]*>)(.*?)(</style\s*>)', re.DOTALL | re.IGNORECASE)
+
+# CSS strings are kept verbatim; comments outside strings are dropped
+CSS_TOKEN = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)', re.DOTALL)
+
+WHITESPACE = re.compile(r'\s+')
+
+def collapse_whitespace(text):
+    """Collapse a whitespace run to one newline (if it had one) or one space"""
+    return WHITESPACE.sub(lambda m: '\n' if '\n' in m.group(0) else ' ', text)
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from CSS, leaving strings alone"""
+    parts = []
+    code = ''
+    last = 0
+    for match in CSS_TOKEN.finditer(css):
+        # Code on both sides of a dropped comment is minified as one run
+        code += css[last:match.start()]
+        if match.group(1):
+            parts.append(('code', code))
+            parts.append(('string', match.group(1)))
+            code = ''
+        last = match.end()
+    parts.append(('code', code + css[last:]))
+
+    result = []
+    for kind, chunk in parts:
+        if kind == 'string':
+            result.append(chunk)
+            continue
+        chunk = WHITESPACE.sub(' ', chunk)
+        chunk = re.sub(r'\s*([{};,])\s*', r'\1', chunk)
+        chunk = re.sub(r':\s+', ':', chunk)
+        chunk = chunk.replace(';}', '}')
+        result.append(chunk)
+
+    return ''.join(result).strip()
+
+def minify_js(js):
+    """Trim indentation and blank lines from JS when that cannot change a string"""
+    # Template literals and line continuations can carry significant whitespace
+    if '`' in js or re.search(r'\\\r?\n', js):
+        return js.strip() + '\n'
+
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line) + '\n'
+
+def minify_html(html):
+    """Collapse whitespace in text nodes and minify inline <style> blocks
+
+    <pre>, <textarea> and <script> contents and every tag are passed through
+    untouched, so inline scripts and attribute values keep their exact bytes.
+    """
+    result = []
+    last = 0
+
+    for match in HTML_TOKEN.finditer(html):
+        result.append(collapse_whitespace(html[last:match.start()]))
+        token = match.group(0)
+
+        if match.group('comment'):
+            if any(marker in token for marker in PRESERVE_COMMENT_MARKERS):
+                result.append(token)
+        elif match.group('raw') and match.group('rawtag').lower() == 'style':
+            result.append(STYLE_BLOCK.sub(
+                lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), token))
+        else:
+            result.append(token)
+
+        last = match.end()
+
+    result.append(collapse_whitespace(html[last:]))
+    return ''.join(result).strip() + '\n'
+
+def minify(path, text):
+    """Dispatch to the minifier for a file type"""
+    if path.endswith('.html'):
+        return minify_html(text)
+    if path.endswith('.css'):
+        return minify_css(text) + '\n'
+    if path.endswith('.js'):
+        return minify_js(text)
+    return text
+
+def process_file(job):
+    """Minify and precompress one file (runs in a worker process)"""
+    path, cached, out_dir, canonical = job
+    with open(path, 'rb') as f:
+        source = f.read()
+
+    digest = content_hash(source + MINIFIER_VERSION.encode())
+    out_path = Path(out_dir) / path
+    outputs = [out_path, Path(f'{out_path}.gz')]
+    if brotli is not None:
+        outputs.append(Path(f'{out_path}.br'))
+
+    if cached and cached.get('hash') == digest and cached.get('canonical') == canonical \
+            and all(p.exists() for p in outputs):
+        return path, cached, True
+
+    data = source
+    if path.endswith(MINIFY_EXTENSIONS):
+        try:
+            text = source.decode('utf-8')
+            # Near-duplicates stay reachable but point search engines at the canonical page
+            head = text.find('</head>')
+            if canonical and head > 0 and 'rel="canonical"' not in text:
+                text = f'{text[:head]}<link rel="canonical" href="{canonical}">{text[head:]}'
+            data = minify(path, text).encode('utf-8')
+        except UnicodeDecodeError:
+            data = source
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(data)
+
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(f'{out_path}.gz', 'wb') as f:
+        f.write(gz_data)
+
+    br_size = None
+    if brotli is not None:
+        br_data = brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+        with open(f'{out_path}.br', 'wb') as f:
+            f.write(br_data)
+        br_size = len(br_data)
+
+    stats = {
+        'hash': digest,
+        'original': len(source),
+        'minified': len(data),
+        'gzip': len(gz_data),
+        'brotli': br_size,
+        'canonical': canonical,
+    }
+    return path, stats, False
+
+def copy_file(path, out_dir):
+    """Copy a binary asset into the output directory (hard link when possible)"""
+    out_path = Path(out_dir) / path
+    source = os.stat(path)
+    # Hard links and copy2 keep the source mtime, so a replaced file shows up
+    # even when its size is unchanged
+    if out_path.exists():
+        target = out_path.stat()
+        if target.st_size == source.st_size and target.st_mtime_ns == source.st_mtime_ns:
+            return
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if out_path.exists():
+        out_path.unlink()
+    try:
+        os.link(path, out_path)
+    except OSError:
+        shutil.copy2(path, out_path)
+
+def remove_stale_outputs(out_dir, expected):
+    """Delete build outputs whose source left the publish set, returns the count"""
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(out_dir, topdown=False):
+        for name in filenames:
+            output = Path(dirpath) / name
+            if output.relative_to(out_dir).as_posix() not in expected:
+                output.unlink()
+                removed += 1
+        if dirpath != out_dir and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+def print_report(results):
+    """Print the transfer-size reduction per page class"""
+    classes = {}
+    for path, stats in results.items():
+        totals = classes.setdefault(page_class(path), {
+            'files': 0, 'original': 0, 'minified': 0, 'gzip': 0, 'brotli': 0})
+        totals['files'] += 1
+        totals['original'] += stats['original']
+        totals['minified'] += stats['minified']
+        totals['gzip'] += stats['gzip']
+        totals['brotli'] += stats['brotli'] or stats['gzip']
+
+    print(f"{'Class':<10} {'Files':>5} {'Original':>10} {'Minified':>10} {'Gzip':>10} {'Brotli':>10} {'Saved':>6}")
+    for name, totals in sorted(classes.items()):
+        saved = 100 * (1 - totals['brotli'] / totals['original']) if totals['original'] else 0
+        print(f"{name:<10} {totals['files']:>5} {format_bytes(totals['original']):>10} "
+              f"{format_bytes(totals['minified']):>10} {format_bytes(totals['gzip']):>10} "
+              f"{format_bytes(totals['brotli']):>10} {saved:>5.1f}%")
+
+def main():
+    """Minify and precompress the publish set into the output directory"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', default=OUTPUT_DIR, help='build output directory')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes')
+    parser.add_argument('--force', action='store_true', help='ignore the hash cache')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("WARNING: brotli module not installed - only writing .gz variants")
+
+    cache = {} if args.force else load_cache('compress')
+
+    # Near-duplicate pages (find_duplicates.py) are still built, since other pages
+    # may link to them, but get a canonical link to the page they duplicate
+    canonicals = {dup: page_url(canonical) for dup, canonical in load_duplicates().items()}
+    text_files = list(iter_publish_files('.', COMPRESS_EXTENSIONS))
+    copy_files = list(iter_publish_files('.', COPY_EXTENSIONS))
+
+    results = {}
+    if args.since:
+        # Unchanged files keep their cached stats; deleted ones leave the build
+        changed, deleted = git_changes(args.since)
+        for path in deleted:
+            for suffix in ('', '.gz', '.br'):
+                output = Path(args.out) / f'{path}{suffix}'
+                if output.exists():
+                    output.unlink()
+        results = {p: cache[p] for p in text_files if p not in changed and p in cache}
+        text_files = [p for p in text_files if p not in results]
+        copy_files = [p for p in copy_files if p in changed]
+    elif os.path.isdir(args.out):
+        # A full run knows the whole publish set, so anything else in the output is stale
+        expected = set(copy_files)
+        expected.update(f'{p}{suffix}' for p in text_files for suffix in ('', '.gz', '.br'))
+        removed = remove_stale_outputs(args.out, expected)
+        if removed:
+            print(f"Removed {removed} stale files from {args.out}/")
+
+    jobs = [(path, cache.get(path), args.out, canonicals.get(path)) for path in text_files]
+
+    print(f"Processing {len(jobs)} text files into {args.out}/ ...")
+
+    skipped = len(results)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for path, stats, was_cached in executor.map(process_file, jobs, chunksize=8):
+            results[path] = stats
+            skipped += was_cached
+
+    for path in copy_files:
+        copy_file(path, args.out)
+
+    save_cache('compress', results)
+
+    print(f"Rebuilt {len(results) - skipped} files, {skipped} unchanged")
+    print()
+    print_report(results)
+
+if __name__ == "__main__":
+    main()
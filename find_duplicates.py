@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate page detection for LarkLabs.org
+Shingles the text of every HTML page, builds MinHash signatures and uses LSH
+buckets to find duplicate clusters, then picks a canonical URL for each cluster
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from site_utils import (CACHE_DIR, add_since_argument, content_hash, git_changes,
+                        iter_publish_files, load_cache, save_cache)
+
+# Report consumed by generate_sitemap.py and compress_assets.py (kept out of
+# the publish root, which Netlify serves as is)
+DUPLICATES_FILE = os.path.join(CACHE_DIR, 'duplicates.json')
+
+# Words per shingle
+SHINGLE_SIZE = 5
+
+# MinHash permutations, split into LSH bands of NUM_PERM / BANDS rows
+NUM_PERM = 64
+BANDS = 8
+
+# Estimated Jaccard similarity at which two pages count as duplicates
+DUPLICATE_THRESHOLD = 0.85
+
+# Pages with fewer shingles than this are too small to compare
+MIN_SHINGLES = 20
+
+# Name tokens that mark a page as a copy rather than the canonical version
+COPY_MARKERS = {'backup', 'test', 'old', 'copy', 'demo', 'template', 'new', 'temp'}
+
+# Directories that hold retired copies of live pages
+ARCHIVE_DIRS = {'archive', 'archived'}
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so cached signatures stay comparable between runs
+_rng = random.Random(149)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+                for _ in range(NUM_PERM)]
+
+SCRIPT_STYLE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+TAG = re.compile(r'<[^>]+>')
+NAME_SEPARATOR = re.compile(r'[-_.\s]+')
+WORD = re.compile(r'\w+')
+
+def page_words(html):
+    """Return the lowercase words of a page's visible text"""
+    text = SCRIPT_STYLE.sub(' ', html)
+    text = TAG.sub(' ', text)
+    return WORD.findall(text.lower())
+
+def shingles(words):
+    """Hash each run of SHINGLE_SIZE words to a 32-bit value"""
+    return {
+        zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+def minhash(hashes):
+    """Build a MinHash signature from a set of shingle hashes"""
+    return [
+        min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+        for a, b in PERMUTATIONS
+    ]
+
+def signature_for(job):
+    """Compute (or reuse) the signature of one page (runs in a worker process)"""
+    path, cached = job
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    digest = content_hash(data)
+    if cached and cached.get('hash') == digest:
+        return path, cached
+
+    hashes = shingles(page_words(data.decode('utf-8', errors='replace')))
+    signature = minhash(hashes) if len(hashes) >= MIN_SHINGLES else None
+    return path, {'hash': digest, 'signature': signature}
+
+def similarity(sig_a, sig_b):
+    """Estimate Jaccard similarity from two signatures"""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+def candidate_pairs(signatures):
+    """Group pages whose signatures collide in at least one LSH band"""
+    rows = NUM_PERM // BANDS
+    pairs = set()
+    for band in range(BANDS):
+        buckets = {}
+        for path, signature in signatures.items():
+            key = tuple(signature[band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(path)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    pairs.add((members[i], members[j]))
+    return pairs
+
+def canonical_rank(path):
+    """Sort key that prefers live, clean, shallow, short page names
+
+    Pages in archive directories or under paths with spaces (copied course
+    folders) rank below everything else, then copy-marked names.
+    """
+    *directories, name = path.lower().split('/')
+    archived = any(directory in ARCHIVE_DIRS for directory in directories)
+    # Whole tokens only, so "temperature" or "g2-practice-tests" are not copies
+    marked = any(token in COPY_MARKERS for token in NAME_SEPARATOR.split(name))
+    return (archived, ' ' in path, marked, len(directories), len(name), path)
+
+def find_clusters(signatures):
+    """Return duplicate clusters as [{'canonical', 'duplicates', 'similarity'}]"""
+    parent = {}
+
+    def find(path):
+        while parent.get(path, path) != path:
+            path = parent[path]
+        return path
+
+    scores = {}
+    for a, b in candidate_pairs(signatures):
+        score = similarity(signatures[a], signatures[b])
+        if score >= DUPLICATE_THRESHOLD:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[root_b] = root_a
+            scores[(a, b)] = score
+
+    groups = {}
+    for path in parent:
+        groups.setdefault(find(path), set()).add(path)
+    for path in list(parent.values()):
+        groups.setdefault(find(path), set()).add(path)
+
+    clusters = []
+    for members in groups.values():
+        ordered = sorted(members, key=canonical_rank)
+        lowest = min(s for pair, s in scores.items() if pair[0] in members)
+        clusters.append({
+            'canonical': ordered[0],
+            'duplicates': ordered[1:],
+            'similarity': round(lowest, 3),
+        })
+
+    return sorted(clusters, key=lambda c: c['canonical'])
+
+def load_duplicates(path=DUPLICATES_FILE):
+    """Return {duplicate page: canonical page} from a saved report"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return {
+        duplicate: cluster['canonical']
+        for cluster in report.get('clusters', [])
+        for duplicate in cluster['duplicates']
+    }
+
+def main():
+    """Detect near-duplicate pages and write the cluster report"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', default=DUPLICATES_FILE, help='report file')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    cache = load_cache('minhash')
+    pages = list(iter_publish_files('.', ('.html',)))
+
+    entries = {}
+    if args.since:
+        # Clustering still needs every signature; only changed pages are recomputed
+        changed, _ = git_changes(args.since)
+        entries = {p: cache[p] for p in pages if p not in changed and p in cache}
+        pages = [p for p in pages if p not in entries]
+
+    print(f"Computing MinHash signatures for {len(pages)} pages...")
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for path, entry in executor.map(signature_for, [(p, cache.get(p)) for p in pages], chunksize=8):
+            entries[path] = entry
+
+    save_cache('minhash', entries)
+
+    signatures = {p: e['signature'] for p, e in entries.items() if e['signature']}
+    clusters = find_clusters(signatures)
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump({'threshold': DUPLICATE_THRESHOLD, 'clusters': clusters}, f, indent=2)
+
+    print("-" * 80)
+    for cluster in clusters:
+        print(f"{cluster['canonical']} (similarity >= {cluster['similarity']})")
+        for duplicate in cluster['duplicates']:
+            print(f"    duplicate: {duplicate}")
+
+    total = sum(len(c['duplicates']) for c in clusters)
+    print("-" * 80)
+    print(f"Found {len(clusters)} clusters with {total} duplicate pages")
+    print(f"Report: {args.out}")
+
+if __name__ == "__main__":
+    main()
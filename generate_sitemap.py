@@ -3,18 +3,33 @@ Sitemap Generator for LarkLabs.org
 Generates sitemap.xml with proper priorities for AI tools and training pages
 """
 
+import argparse
 import os
+import re
 from datetime import datetime
 from pathlib import Path
 import html
 
+from find_duplicates import DUPLICATES_FILE, load_duplicates
+from site_utils import add_since_argument, git_changes
+
+BASE_URL = 'https://larklabs.org'
+
+SITEMAP_FILE = 'sitemap.xml'
+
+# Root pages that never go in the sitemap
+EXCLUDED_ROOT_FILES = ['index.html', 'UNIT_PAGE_TEMPLATE.html', 'index_backup_original.html', 'index_new_testing.html']
+
+# Pages whose path contains any of these are skipped
+SKIP_KEYWORDS = ['backup', 'template', 'test', 'cancel', 'success', 'protected']
+
 def get_all_html_files():
     """Get all HTML files in the website"""
     html_files = []
 
     # Root directory HTML files
     for file in Path('.').glob('*.html'):
-        if file.name not in ['index.html', 'UNIT_PAGE_TEMPLATE.html', 'index_backup_original.html', 'index_new_testing.html']:
+        if file.name not in EXCLUDED_ROOT_FILES:
             html_files.append(str(file))
 
     # Pages subdirectories
@@ -66,9 +81,82 @@ def get_changefreq(filename):
     # Other
     return 'monthly'
 
+def is_sitemap_page(file_path):
+    """Check if a changed file belongs in the sitemap (same rules as a full build)"""
+    file_path = file_path.replace('\\', '/')
+    if not file_path.endswith('.html') or not os.path.exists(file_path):
+        return False
+    if '/' not in file_path:
+        in_scope = file_path not in EXCLUDED_ROOT_FILES
+    else:
+        in_scope = file_path.startswith('pages/')
+    return in_scope and not any(skip in file_path for skip in SKIP_KEYWORDS)
+
+def url_entry(file_path, base_url, now):
+    """Build the <url> block for one page"""
+    # Escape special XML characters in URL (&, <, >, ", ')
+    url_path_escaped = html.escape(file_path.replace('\\', '/'), quote=False)
+
+    filename = os.path.basename(file_path)
+    priority = get_priority(filename)
+    changefreq = get_changefreq(filename)
+
+    return f'''  <url>
+    <loc>{base_url}/{url_path_escaped}</loc>
+    <lastmod>{now}</lastmod>
+    <changefreq>{changefreq}</changefreq>
+    <priority>{priority}</priority>
+  </url>
+'''
+
+def url_block_pattern(file_path, base_url):
+    """Match an existing <url> block (and its leading whitespace) by location"""
+    loc = html.escape(f"{base_url}/{file_path.replace(chr(92), '/')}", quote=False)
+    return re.compile(r'\n?[ \t]*<url>\s*<loc>' + re.escape(loc) + r'</loc>.*?</url>', re.DOTALL)
+
+def merge_sitemap(since):
+    """Update sitemap.xml in place for pages changed since a git revision"""
+    base_url = BASE_URL
+    now = datetime.now().strftime('%Y-%m-%d')
+
+    if not os.path.exists(SITEMAP_FILE):
+        print(f"{SITEMAP_FILE} not found - generating a full sitemap")
+        generate_sitemap()
+        return
+
+    with open(SITEMAP_FILE, 'r', encoding='utf-8') as f:
+        sitemap = f.read()
+
+    changed, deleted = git_changes(since)
+    duplicates = load_duplicates()
+    added = updated = removed = 0
+
+    for file_path in sorted(p for p in changed | deleted if p.endswith('.html')):
+        pattern = url_block_pattern(file_path, base_url)
+        existing = pattern.search(sitemap)
+
+        if file_path in deleted or file_path in duplicates or not is_sitemap_page(file_path):
+            if existing:
+                sitemap = sitemap[:existing.start()] + sitemap[existing.end():]
+                removed += 1
+        elif existing:
+            block = re.sub(r'<lastmod>.*?</lastmod>', f'<lastmod>{now}</lastmod>', existing.group(0), count=1)
+            sitemap = sitemap[:existing.start()] + block + sitemap[existing.end():]
+            updated += 1
+        else:
+            end = sitemap.rindex('</urlset>')
+            sitemap = sitemap[:end] + url_entry(file_path, base_url, now) + sitemap[end:]
+            added += 1
+
+    with open(SITEMAP_FILE, 'w', encoding='utf-8') as f:
+        f.write(sitemap)
+
+    print(f"Sitemap merged since {since}: {added} added, {updated} updated, {removed} removed")
+    print(f"File: {SITEMAP_FILE}")
+
 def generate_sitemap():
     """Generate sitemap.xml"""
-    base_url = 'https://larklabs.org'
+    base_url = BASE_URL
     now = datetime.now().strftime('%Y-%m-%d')
 
     # Start sitemap
@@ -88,42 +176,39 @@ def generate_sitemap():
     # Get all HTML files
     html_files = get_all_html_files()
 
+    # Drop near-duplicates found by find_duplicates.py, keeping the canonical page
+    duplicates = load_duplicates()
+    html_files = [f for f in html_files if f not in duplicates]
+    if duplicates:
+        print(f"Excluding {len(duplicates)} near-duplicate pages (see {DUPLICATES_FILE})")
+
     # Sort for consistent ordering
     html_files.sort()
 
     # Add each page
     for file_path in html_files:
-        # Clean up path
-        url_path = file_path.replace('\\', '/')
-
-        # Escape special XML characters in URL (&, <, >, ", ')
-        url_path_escaped = html.escape(url_path, quote=False)
-
         # Skip certain files
-        if any(skip in file_path for skip in ['backup', 'template', 'test', 'cancel', 'success', 'protected']):
+        if any(skip in file_path for skip in SKIP_KEYWORDS):
             continue
 
-        filename = os.path.basename(file_path)
-        priority = get_priority(filename)
-        changefreq = get_changefreq(filename)
-
-        sitemap += f'''  <url>
-    <loc>{base_url}/{url_path_escaped}</loc>
-    <lastmod>{now}</lastmod>
-    <changefreq>{changefreq}</changefreq>
-    <priority>{priority}</priority>
-  </url>
-'''
+        sitemap += url_entry(file_path, base_url, now)
 
     # Close sitemap
     sitemap += '</urlset>'
 
     # Write sitemap
-    with open('sitemap.xml', 'w', encoding='utf-8') as f:
+    with open(SITEMAP_FILE, 'w', encoding='utf-8') as f:
         f.write(sitemap)
 
     print(f"Sitemap generated with {len(html_files) + 1} URLs")
-    print("File: sitemap.xml")
+    print(f"File: {SITEMAP_FILE}")
 
 if __name__ == "__main__":
-    generate_sitemap()
+    parser = argparse.ArgumentParser(description='Sitemap Generator for LarkLabs.org')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    if args.since:
+        merge_sitemap(args.since)
+    else:
+        generate_sitemap()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Page-load benchmark harness for LarkLabs.org
+Replays the sitemap.xml URL list against a local preview server with concurrent
+keep-alive clients and reports latency percentiles, bytes on the wire and
+throughput per page class
+"""
+
+import argparse
+import http.client
+import math
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+from preview_server import DEFAULT_PORT, OUTPUT_DIR, make_server
+from site_utils import BASE_URL, format_bytes, page_class
+
+SITEMAP_FILE = 'sitemap.xml'
+
+LOC = re.compile(r'<loc>\s*(.*?)\s*</loc>')
+
+def sitemap_paths(sitemap_path=SITEMAP_FILE, base_url=BASE_URL):
+    """Return the URL paths listed in the sitemap"""
+    with open(sitemap_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    paths = []
+    for loc in LOC.findall(content):
+        loc = loc.replace('&amp;', '&')
+        if loc.startswith(base_url):
+            # Request lines cannot carry raw spaces; existing escapes are kept
+            paths.append(quote(urlsplit(loc).path, safe='/%') or '/')
+    return paths
+
+def path_class(path):
+    """Page class of a URL path (see site_utils.page_class)"""
+    path = path.lstrip('/')
+    if not path or path.endswith('/'):
+        path += 'index.html'
+    return page_class(path)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+class Client:
+    """One keep-alive connection per worker thread"""
+
+    def __init__(self, host, port, encodings, https=False):
+        self.host = host
+        self.port = port
+        self.encodings = encodings
+        self.connection_class = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.connection_class(self.host, self.port, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def fetch(self, path):
+        """Request one path, returns (path, status, ttfb, total time, wire bytes)"""
+        for attempt in range(2):
+            conn = self.connection()
+            try:
+                start = time.perf_counter()
+                conn.request('GET', path, headers={'Accept-Encoding': self.encodings})
+                response = conn.getresponse()
+                ttfb = time.perf_counter() - start
+                body = response.read()
+                total = time.perf_counter() - start
+                header_bytes = sum(len(k) + len(v) + 4 for k, v in response.getheaders())
+                return path, response.status, ttfb, total, len(body) + header_bytes
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+def run_load(paths, host, port, concurrency, rounds, encodings, https=False):
+    """Replay the paths `rounds` times across `concurrency` clients"""
+    client = Client(host, port, encodings, https)
+    jobs = paths * rounds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(client.fetch, jobs))
+    return results, time.perf_counter() - start
+
+def print_report(results, elapsed):
+    """Print latency percentiles, bytes on the wire and throughput per page class"""
+    classes = {}
+    for path, status, ttfb, total, wire in results:
+        classes.setdefault(path_class(path), []).append((status, ttfb, total, wire))
+
+    errors = sum(1 for r in results if r[1] >= 400)
+    total_bytes = sum(r[4] for r in results)
+    print(f"{len(results)} requests in {elapsed:.2f} s: {len(results) / elapsed:.0f} req/s, "
+          f"{format_bytes(total_bytes / elapsed)}/s, {errors} errors")
+    print()
+    print(f"{'Class':<10} {'Reqs':>5} {'TTFB p50':>9} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'Avg bytes':>10} {'Req/s':>7} {'Bytes/s':>10}")
+    for name, rows in sorted(classes.items()):
+        ttfbs = [r[1] * 1000 for r in rows]
+        totals = [r[2] * 1000 for r in rows]
+        wire = [r[3] for r in rows]
+        print(f"{name:<10} {len(rows):>5} {statistics.median(ttfbs):>7.1f}ms "
+              f"{percentile(totals, 50):>6.1f}ms {percentile(totals, 95):>6.1f}ms {percentile(totals, 99):>6.1f}ms "
+              f"{format_bytes(statistics.mean(wire)):>10} {len(rows) / elapsed:>7.0f} {format_bytes(sum(wire) / elapsed):>10}")
+
+def main():
+    """Benchmark page loads for the sitemap URL list"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='server to test (default: start a preview server)')
+    parser.add_argument('--root', default=OUTPUT_DIR, help='build directory for the built-in server')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port for the built-in server')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--rounds', type=int, default=3, help='times to replay the URL list')
+    parser.add_argument('--encoding', default='br, gzip', help='Accept-Encoding to send ("identity" for raw)')
+    args = parser.parse_args()
+
+    paths = sitemap_paths()
+    print(f"Replaying {len(paths)} sitemap URLs x {args.rounds} with {args.concurrency} clients")
+
+    server = None
+    https = False
+    if args.url:
+        target = urlsplit(args.url)
+        https = target.scheme == 'https'
+        host, port = target.hostname, target.port or (443 if https else 80)
+    else:
+        server = make_server(args.root, args.port, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = '127.0.0.1', args.port
+        print(f"Started preview server for {args.root}/ on port {port}")
+
+    try:
+        # Warm-up pass so the first round does not measure cold disk reads
+        run_load(paths, host, port, args.concurrency, 1, args.encoding, https)
+        results, elapsed = run_load(paths, host, port, args.concurrency, args.rounds, args.encoding, https)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    print("-" * 80)
+    print_report(results, elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Responsive image pipeline for LarkLabs.org
+Generates resized WebP (and optionally AVIF) variants of raster images, rewrites
+<img> tags across all HTML pages with srcset/sizes, intrinsic size and lazy loading,
+and adds media-query variants for background images set in inline <style> blocks
+"""
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from site_utils import (add_since_argument, content_hash, git_changes, iter_publish_files,
+                        load_cache, save_cache)
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is needed to build variants
+    Image = None
+
+# Where generated variants are written
+VARIANT_DIR = 'assets/images/responsive'
+
+# Target widths for srcset candidates
+RESPONSIVE_WIDTHS = [480, 960, 1440, 1920]
+
+# Images narrower than this only get width/height, not a srcset
+MIN_RESPONSIVE_WIDTH = 480
+
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+
+# Images before this position in <body> are treated as above the fold
+ABOVE_FOLD_IMAGES = 2
+
+RASTER_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+IMG_TAG = re.compile(r'<img\b(?:"[^"]*"|\'[^\']*\'|[^\'">])*>', re.IGNORECASE)
+ATTRIBUTE = re.compile(r'([a-zA-Z:-]+)\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+)')
+
+# Inline style declarations that decide how wide an <img> is drawn
+SIZE_DECLARATION = re.compile(r'(?:^|;)\s*(width|height|max-width)\s*:\s*([^;]+)', re.IGNORECASE)
+CSS_LENGTH = re.compile(r'^\d+(?:\.\d+)?(?:px|em|rem|vw|vh|vmin|vmax|ch)$', re.IGNORECASE)
+PIXELS = re.compile(r'^(\d+(?:\.\d+)?)(?:px)?$', re.IGNORECASE)
+
+STYLE_BLOCK = re.compile(r'(<style\b[^>]*>)(.*?)(</style\s*>)', re.DOTALL | re.IGNORECASE)
+CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+BACKGROUND_DECLARATION = re.compile(r'background(?:-image)?\s*:\s*([^;}]*url\([^;}]*)', re.IGNORECASE)
+BACKGROUND_LAYER = re.compile(
+    r'(?:repeating-)?(?:linear|radial|conic)-gradient\((?:[^()]|\([^()]*\))*\)'
+    r'|url\(\s*([\'"]?)([^\'")]*)\1\s*\)', re.IGNORECASE)
+
+def variant_path(src, width, fmt):
+    """Return the output path for one resized variant"""
+    stem = Path(src).with_suffix('').as_posix()
+    if stem.startswith('assets/images/'):
+        stem = stem[len('assets/images/'):]
+    stem = stem.replace('/', '_')
+    return f"{VARIANT_DIR}/{stem}-{width}w.{fmt}"
+
+def build_variants(job):
+    """Resize one source image into every target width (runs in a worker process)"""
+    src, cached, formats = job
+    with open(src, 'rb') as f:
+        digest = content_hash(f.read())
+
+    if cached and cached.get('hash') == digest and cached.get('formats') == formats \
+            and all(os.path.exists(v['path']) for v in cached['variants']):
+        return src, cached, True
+
+    try:
+        entry = resize_image(src, digest, formats)
+    except Exception as e:
+        # One unreadable image (or a Pillow build without AVIF) must not stop the run
+        return src, {'error': f"{type(e).__name__}: {e}"}, False
+    return src, entry, False
+
+def resize_image(src, digest, formats):
+    """Write the variants of one source image, returns its cache entry"""
+    with Image.open(src) as image:
+        image.load()
+        width, height = image.size
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        targets = [w for w in RESPONSIVE_WIDTHS if w < width]
+        if width >= MIN_RESPONSIVE_WIDTH:
+            targets.append(min(width, RESPONSIVE_WIDTHS[-1]))
+
+        variants = []
+        for target in sorted(set(targets)):
+            resized = image if target == width else image.resize(
+                (target, round(height * target / width)), Image.LANCZOS)
+            for fmt in formats:
+                out_path = variant_path(src, target, fmt)
+                Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+                if fmt == 'webp':
+                    resized.save(out_path, 'WEBP', quality=WEBP_QUALITY, method=6)
+                else:
+                    resized.save(out_path, 'AVIF', quality=AVIF_QUALITY)
+                variants.append({'width': target, 'format': fmt, 'path': out_path})
+
+    return {
+        'hash': digest,
+        'width': width,
+        'height': height,
+        'formats': formats,
+        'variants': variants,
+    }
+
+def resolve_src(page, src):
+    """Resolve an <img> src to a repo-relative path, or None for external images"""
+    src = src.split('?')[0].split('#')[0]
+    if not src or src.startswith(('http:', 'https:', '//', 'data:')):
+        return None
+    if src.startswith('/'):
+        path = src.lstrip('/')
+    else:
+        path = os.path.normpath(os.path.join(os.path.dirname(page), src))
+    return path.replace('\\', '/')
+
+def relative_url(page, path):
+    """Build a URL for a repo path that works from the given page"""
+    return os.path.relpath(path, os.path.dirname(page) or '.').replace('\\', '/')
+
+def srcset_for(page, entry, fmt):
+    """Build a srcset attribute value for one format"""
+    return ', '.join(
+        f"{relative_url(page, v['path'])} {v['width']}w"
+        for v in entry['variants'] if v['format'] == fmt
+    )
+
+def display_size(values, entry):
+    """Return the sizes value for an <img>: the width its inline style or width
+    attribute gives it, or the full viewport when neither says"""
+    style = {name.lower(): value.strip().lower()
+             for name, value in SIZE_DECLARATION.findall(values.get('style', ''))}
+
+    for name in ('width', 'max-width'):
+        if CSS_LENGTH.match(style.get(name, '')):
+            return style[name]
+
+    # Height-only sizing scales the width by the intrinsic aspect ratio
+    height = style.get('height', '')
+    if CSS_LENGTH.match(height) and style.get('width', 'auto') == 'auto':
+        pixels = PIXELS.match(height)
+        if pixels:
+            return f"{round(float(pixels.group(1)) * entry['width'] / entry['height'])}px"
+        return f"calc({height} * {entry['width']} / {entry['height']})"
+
+    width = PIXELS.match(values.get('width', ''))
+    if width:
+        return f"{round(float(width.group(1)))}px"
+    return '100vw'
+
+def rewrite_img_tag(page, tag, entry, lazy):
+    """Add srcset/sizes, intrinsic size and loading hints to one <img> tag"""
+    values = {name.lower(): value.strip('"\'') for name, value in ATTRIBUTE.findall(tag)}
+    attrs = set(values)
+    additions = []
+
+    # An inline style that sizes the image would be fighting the intrinsic
+    # attributes, which distorts it
+    styled = {name.lower() for name, _ in SIZE_DECLARATION.findall(values.get('style', ''))}
+    if 'width' not in attrs and 'height' not in attrs and not styled:
+        additions.append(f'width="{entry["width"]}" height="{entry["height"]}"')
+
+    has_variants = any(v['format'] == 'webp' for v in entry['variants'])
+    if has_variants and 'srcset' not in attrs:
+        additions.append(f'srcset="{srcset_for(page, entry, "webp")}"')
+        if 'sizes' not in attrs:
+            additions.append(f'sizes="{display_size(values, entry)}"')
+
+    if lazy and 'loading' not in attrs:
+        additions.append('loading="lazy"')
+    if lazy and 'decoding' not in attrs:
+        additions.append('decoding="async"')
+
+    if not additions:
+        return tag
+
+    end = -2 if tag.endswith('/>') else -1
+    new_tag = tag[:end].rstrip() + ' ' + ' '.join(additions) + tag[end:]
+
+    # AVIF needs a <picture> wrapper so browsers without support fall back to WebP
+    if 'srcset' not in attrs and any(v['format'] == 'avif' for v in entry['variants']):
+        new_tag = (f'<picture><source type="image/avif" srcset="{srcset_for(page, entry, "avif")}">'
+                   f'{new_tag}</picture>')
+
+    return new_tag
+
+def background_image_set(page, entry, width):
+    """Build an image-set() of the WebP variants for a viewport width (1x and 2x)"""
+    webp = sorted((v for v in entry['variants'] if v['format'] == 'webp'), key=lambda v: v['width'])
+    candidates = []
+    for density in (1, 2):
+        fitting = [v for v in webp if v['width'] >= width * density] or webp[-1:]
+        url = relative_url(page, fitting[0]['path'])
+        if all(url != c[0] for c in candidates):
+            candidates.append((url, density))
+    return 'image-set(' + ', '.join(f"url('{url}') {density}x" for url, density in candidates) + ')'
+
+def rewrite_backgrounds(page, css, images):
+    """Add max-width media queries serving resized variants for background images
+
+    The original declaration stays as the fallback for wide screens and browsers
+    without image-set(). Returns (new css, number of backgrounds changed).
+    """
+    changed = 0
+
+    def replace_rule(match):
+        nonlocal changed
+        selector, body = match.group(1), match.group(2)
+        overrides = []
+        for declaration in BACKGROUND_DECLARATION.finditer(body):
+            layers = list(BACKGROUND_LAYER.finditer(declaration.group(1)))
+            local = [(layer, resolve_src(page, layer.group(2) or '')) for layer in layers]
+            entry = next((images[path] for _, path in local if path in images), None)
+            if entry is None or not any(v['format'] == 'webp' for v in entry['variants']):
+                continue
+            # Already rewritten on an earlier run
+            if any(relative_url(page, v['path']) in css for v in entry['variants']):
+                continue
+
+            widths = sorted({v['width'] for v in entry['variants'] if v['format'] == 'webp'}, reverse=True)
+            for width in widths:
+                value = ', '.join(
+                    background_image_set(page, images[path], width) if path in images else layer.group(0)
+                    for layer, path in local)
+                overrides.append(f"@media (max-width: {width}px) {{ {selector.strip()} {{ background-image: {value}; }} }}")
+            changed += 1
+
+        return match.group(0) + (' ' + ' '.join(overrides) if overrides else '')
+
+    return CSS_RULE.sub(replace_rule, css), changed
+
+def rewrite_page(page, images):
+    """Rewrite local <img> tags and inline-style backgrounds in one page
+
+    Returns (img tags changed, backgrounds changed).
+    """
+    with open(page, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    body_start = content.lower().find('<body')
+    position = 0
+    changed = 0
+
+    def replace(match):
+        nonlocal position, changed
+        tag = match.group(0)
+        if match.start() > body_start:
+            position += 1
+
+        src = dict((n.lower(), v.strip('"\'')) for n, v in ATTRIBUTE.findall(tag)).get('src')
+        path = resolve_src(page, src or '')
+        if path not in images:
+            return tag
+
+        new_tag = rewrite_img_tag(page, tag, images[path], lazy=position > ABOVE_FOLD_IMAGES)
+        if new_tag != tag:
+            changed += 1
+        return new_tag
+
+    new_content = IMG_TAG.sub(replace, content)
+
+    backgrounds = 0
+
+    def replace_style(match):
+        nonlocal backgrounds
+        css, count = rewrite_backgrounds(page, match.group(2), images)
+        backgrounds += count
+        return match.group(1) + css + match.group(3)
+
+    new_content = STYLE_BLOCK.sub(replace_style, new_content)
+
+    if changed or backgrounds:
+        with open(page, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+    return changed, backgrounds
+
+def main():
+    """Build image variants and rewrite <img> tags"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--avif', action='store_true', help='also generate AVIF variants')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes')
+    parser.add_argument('--no-rewrite', action='store_true', help='only build variants')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    if Image is None:
+        print("ERROR: Pillow is required (pip install Pillow)")
+        return
+
+    formats = ['webp', 'avif'] if args.avif else ['webp']
+    cache = load_cache('images')
+
+    sources = [p for p in iter_publish_files('.', RASTER_EXTENSIONS)
+               if not p.startswith(VARIANT_DIR)]
+    pages = list(iter_publish_files('.', ('.html',)))
+
+    images = {}
+    if args.since:
+        # Unchanged images keep their cached variants; only changed pages are rewritten
+        changed, _ = git_changes(args.since)
+        images = {src: cache[src] for src in sources
+                  if src not in changed and cache.get(src, {}).get('formats') == formats}
+        sources = [src for src in sources if src not in images]
+        pages = [page for page in pages if page in changed]
+
+    jobs = [(src, cache.get(src), formats) for src in sources]
+
+    print(f"Building {'/'.join(formats)} variants for {len(jobs)} images...")
+    print("-" * 80)
+
+    built = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for src, entry, was_cached in executor.map(build_variants, jobs):
+            if 'error' in entry:
+                failed += 1
+                print(f"[ERROR] {src}: {entry['error']}")
+                continue
+            images[src] = entry
+            if not was_cached:
+                built += 1
+                print(f"[OK] {src}: {len(entry['variants'])} variants")
+
+    save_cache('images', images)
+    print(f"Built {built} images, {len(images) - built} unchanged, {failed} failed")
+
+    if args.no_rewrite:
+        return
+
+    total_tags = 0
+    total_backgrounds = 0
+    pages_changed = 0
+    for page in pages:
+        count, backgrounds = rewrite_page(page, images)
+        if count or backgrounds:
+            pages_changed += 1
+            total_tags += count
+            total_backgrounds += backgrounds
+            print(f"[OK] {page}: {count} <img> tags, {backgrounds} backgrounds updated")
+
+    print("-" * 80)
+    print(f"Updated {total_tags} <img> tags and {total_backgrounds} backgrounds across {pages_changed} pages")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Local preview server for the LarkLabs.org build output
+Serves dist/ with the netlify.toml redirects and headers, precompressed .br/.gz
+variants and conditional caching, so TTFB and transfer size can be measured locally
+"""
+
+import argparse
+import email.utils
+import fnmatch
+import mimetypes
+import os
+import posixpath
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from collapse_redirects import NETLIFY_CONFIG, file_for_path, load_rules, resolve, tomllib
+
+# Directory served by default (written by compress_assets.py)
+OUTPUT_DIR = 'dist'
+
+DEFAULT_PORT = 8888
+
+# Precompressed siblings, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Content types served from precompressed siblings when available
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml',
+                      'image/svg+xml', 'application/manifest+json')
+
+mimetypes.add_type('application/javascript', '.js')
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+
+def load_header_rules(config_path=NETLIFY_CONFIG):
+    """Parse the [[headers]] rules from netlify.toml as (pattern, values) pairs"""
+    with open(config_path, 'rb') as f:
+        config = tomllib.load(f)
+    return [(rule['for'], rule.get('values', {})) for rule in config.get('headers', [])]
+
+def headers_for(path, header_rules):
+    """Collect the configured headers for a URL path (later rules win)"""
+    headers = {}
+    for pattern, values in header_rules:
+        # Netlify matches "*.js" against the file name and "/x/*" against the path
+        target = path if pattern.startswith('/') else posixpath.basename(path)
+        if fnmatch.fnmatchcase(target, pattern):
+            headers.update(values)
+    return headers
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    """Serve one request the way the Netlify deploy would"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'LarkPreview/1.0'
+
+    # Headers and body go out in separate writes; avoid the Nagle/delayed-ACK stall
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def send_simple(self, status, message, extra=None):
+        body = message.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def handle_request(self, send_body):
+        root = self.server.root
+        path = unquote(urlsplit(self.path).path) or '/'
+        # Collapse "." and ".." (including encoded ones) before any lookup
+        path = posixpath.normpath('/' + path.lstrip('/')) + ('/' if path.endswith('/') and path != '/' else '')
+
+        kind, target, _ = resolve(path, self.server.rules, root)
+        if kind == 'redirect':
+            self.send_simple(301, f"Redirecting to {target}\n", {'Location': target})
+            return
+        if kind == 'proxy':
+            self.send_simple(502, f"Proxy to {target} is not available in preview\n")
+            return
+        if kind in ('missing', 'loop'):
+            self.send_simple(404, "Not found\n")
+            return
+
+        serve_path = path if kind == 'file' else target
+        file_path = file_for_path(serve_path, root)
+        if file_path is None:
+            self.send_simple(404, "Not found\n")
+            return
+        self.send_file(path, file_path, send_body)
+
+    def send_file(self, url_path, file_path, send_body):
+        full_path = os.path.join(self.server.root, file_path)
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+
+        # Pick the best precompressed sibling the client accepts
+        encoding = None
+        accepted = self.headers.get('Accept-Encoding', '')
+        if content_type.startswith(COMPRESSIBLE_TYPES):
+            for name, suffix in ENCODINGS:
+                if name in accepted and os.path.isfile(full_path + suffix):
+                    encoding = name
+                    full_path += suffix
+                    break
+
+        stat = os.stat(full_path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        headers = headers_for(url_path, self.server.header_rules)
+        headers.setdefault('Cache-Control', 'public, max-age=0, must-revalidate')
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        with open(full_path, 'rb') as f:
+            body = f.read()
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type + ('; charset=utf-8' if content_type.startswith('text/') else ''))
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(body)
+
+def make_server(root=OUTPUT_DIR, port=DEFAULT_PORT, quiet=False):
+    """Create (but do not start) a preview server for a build directory"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), PreviewHandler)
+    server.daemon_threads = True
+    server.root = root
+    server.rules = load_rules()
+    server.header_rules = load_header_rules()
+    server.quiet = quiet
+    return server
+
+def main():
+    """Serve the build output until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', default=OUTPUT_DIR, help='directory to serve')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--quiet', action='store_true', help='do not log requests')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"ERROR: {args.root}/ not found - run compress_assets.py first")
+        return
+
+    server = make_server(args.root, args.port, args.quiet)
+    print(f"Serving {args.root}/ at http://127.0.0.1:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,31 @@
 """
 Replace 'Training' with 'Resource' or 'Resources' across all HTML files
 Intelligently determines singular vs plural based on context
+Only text nodes and human-readable attribute values are rewritten
 """
 
+import argparse
+import bisect
+import glob
+import json
 import os
 import re
+import time
 from pathlib import Path
 
+from site_utils import add_since_argument, content_hash, git_changes
+
 # Directory to process
 WEBSITE_DIR = r"C:\Users\m_kap\OneDrive\Desktop\Personal\LARKLabs\Website"
 
 # Directories to exclude
 EXCLUDE_DIRS = {'node_modules', '.git', 'backups'}
 
+# Bump when the change set format changes
+CHANGE_SET_VERSION = 1
+
+TRAINING_WORD = re.compile(r'\btraining\b', re.IGNORECASE)
+
 # Patterns for plural context (should become "Resources")
 PLURAL_PATTERNS = [
     r'training\s+materials',
@@ -37,6 +50,73 @@ KEEP_TRAINING_PATTERNS = [
     r'on-the-job\s+training',  # Employment term
 ]
 
+# Attribute values that hold visible or readable text
+TEXT_ATTRIBUTES = {'alt', 'title', 'placeholder', 'aria-label'}
+
+# <meta> tags whose content attribute is readable text
+TEXT_META_NAMES = {
+    'description', 'keywords', 'og:title', 'og:description',
+    'twitter:title', 'twitter:description',
+}
+
+# Comments and <script>/<style> payloads are skipped whole
+OPAQUE_BLOCK = re.compile(r'<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>', re.DOTALL | re.IGNORECASE)
+
+# Splits the remaining markup into alternating text and tags
+TAG_SPLIT = re.compile(r'(<[^>]*>)')
+
+TAG_ATTRIBUTE = re.compile(r'([a-zA-Z:-]+)\s*=\s*("[^"]*"|\'[^\']*\')')
+
+# Cheap pre-check so most tags are passed through without parsing attributes
+HAS_TEXT_ATTRIBUTE = re.compile(r'\b(?:alt|title|placeholder|aria-label|content)\s*=', re.IGNORECASE)
+
+def iter_tag_segments(tag):
+    """Split one tag into markup and the text attribute values it carries"""
+    attributes = TAG_ATTRIBUTE.findall(tag)
+    meta_name = ''
+    if tag[1:5].lower() == 'meta':
+        for name, value in attributes:
+            if name.lower() in ('name', 'property'):
+                meta_name = value[1:-1].lower()
+
+    last = 0
+    for match in TAG_ATTRIBUTE.finditer(tag):
+        name = match.group(1).lower()
+        if name in TEXT_ATTRIBUTES or (name == 'content' and meta_name in TEXT_META_NAMES):
+            value_start = match.start(2) + 1
+            value_end = match.end(2) - 1
+            yield 'markup', tag[last:value_start]
+            yield 'attribute', tag[value_start:value_end]
+            last = value_end
+    yield 'markup', tag[last:]
+
+def iter_segments(content):
+    """Stream a document as (kind, chunk) pairs
+
+    Text nodes are yielded as 'text' and readable attribute values as
+    'attribute'; tags, comments and <script>/<style> payloads are yielded as
+    'markup' to be passed through.
+    """
+    last = 0
+    for block in OPAQUE_BLOCK.finditer(content):
+        yield from _iter_markup(content[last:block.start()])
+        yield 'markup', block.group(0)
+        last = block.end()
+    yield from _iter_markup(content[last:])
+
+def _iter_markup(chunk):
+    """Yield the text nodes and tags of a chunk with no comments or raw text blocks"""
+    pieces = TAG_SPLIT.split(chunk)
+    for i, piece in enumerate(pieces):
+        if not piece:
+            continue
+        if i % 2 == 0:
+            yield 'text', piece
+        elif HAS_TEXT_ATTRIBUTE.search(piece):
+            yield from iter_tag_segments(piece)
+        else:
+            yield 'markup', piece
+
 def should_keep_as_training(text, match_pos):
     """Check if this instance should remain as 'training'"""
     # Get context around the match (50 chars before and after)
@@ -71,18 +151,14 @@ def should_be_plural(text, match_pos):
 
     return False
 
-def replace_training_in_text(text):
-    """Replace training with resource/resources intelligently"""
-    result = text
-    changes = []
+def find_training_replacements(text):
+    """Return (pos, original, replacement) for each training to replace, in order"""
+    replacements = []
 
     # Find all occurrences of "training" or "Training"
     pattern = re.compile(r'\b(training|Training|TRAINING)\b')
 
-    # Process matches in reverse order to maintain positions
-    matches = list(pattern.finditer(text))
-
-    for match in reversed(matches):
+    for match in pattern.finditer(text):
         original = match.group(0)
         pos = match.start()
 
@@ -108,24 +184,208 @@ def replace_training_in_text(text):
             else:  # TRAINING
                 replacement = 'RESOURCE'
 
-        # Make the replacement
+        replacements.append((pos, original, replacement))
+
+    return replacements
+
+def replace_training_in_text(text):
+    """Replace training with resource/resources intelligently"""
+    result = text
+    changes = find_training_replacements(text)
+
+    # Process matches in reverse order to maintain positions
+    for pos, original, replacement in reversed(changes):
         result = result[:pos] + replacement + result[pos + len(original):]
-        changes.append((original, replacement, pos))
 
     return result, len(changes)
 
+def replace_training_in_html(content):
+    """Run the replacement over the text segments of a document only"""
+    parts = []
+    last = 0
+    replacements = plan_html_replacements(content)
+    for pos, original, replacement in replacements:
+        parts.append(content[last:pos])
+        parts.append(replacement)
+        last = pos + len(original)
+    parts.append(content[last:])
+    return ''.join(parts), len(replacements)
+
+def plan_html_replacements(content):
+    """Return (char offset, old, new) for every replacement in a document
+
+    Text nodes are joined into one stream, with a space wherever markup sat
+    between them, so the singular/plural context still spans inline tags
+    ("G2 Training</a> programs"). Matches are mapped back through the offset
+    map and only ever fall inside text nodes. Attribute values are matched
+    on their own.
+    """
+    replacements = []
+    stream = []
+    stream_starts = []
+    doc_starts = []
+    stream_length = 0
+    offset = 0
+    previous = None
+    for kind, chunk in iter_segments(content):
+        if kind == 'text':
+            if previous == 'markup' and stream:
+                stream.append(' ')
+                stream_length += 1
+            stream_starts.append(stream_length)
+            doc_starts.append(offset)
+            stream.append(chunk)
+            stream_length += len(chunk)
+        elif kind == 'attribute' and TRAINING_WORD.search(chunk):
+            replacements.extend(
+                (offset + pos, original, replacement)
+                for pos, original, replacement in find_training_replacements(chunk)
+            )
+        if chunk:
+            previous = 'markup' if kind != 'text' else kind
+        offset += len(chunk)
+
+    text = ''.join(stream)
+    if TRAINING_WORD.search(text):
+        for pos, original, replacement in find_training_replacements(text):
+            i = bisect.bisect_right(stream_starts, pos) - 1
+            replacements.append((doc_starts[i] + pos - stream_starts[i], original, replacement))
+
+    return sorted(replacements)
+
+def plan_file(filepath, rel_path):
+    """Build the change set entry for one file, or None if nothing would change"""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+
+    # Decode without newline translation so offsets match the bytes on disk
+    content = data.decode('utf-8')
+    replacements = plan_html_replacements(content)
+    if not replacements:
+        return None
+
+    edits = []
+    byte_pos = 0
+    char_pos = 0
+    for pos, original, replacement in replacements:
+        byte_pos += len(content[char_pos:pos].encode('utf-8'))
+        char_pos = pos
+        edits.append([byte_pos, original, replacement])
+
+    return {
+        'path': rel_path,
+        'hash': content_hash(data),
+        'applied_hash': content_hash(apply_edits(data, edits)),
+        'edits': edits,
+    }
+
+def apply_edits(data, edits, reverse=False):
+    """Patch bytes at the recorded offsets (or undo a patch) without any matching
+
+    Offsets refer to the original file. When reverting, they are shifted by the
+    size change of every earlier edit to find the text in the patched file.
+    """
+    parts = []
+    last = 0
+    shift = 0
+    for offset, old, new in edits:
+        old_bytes = old.encode('utf-8')
+        new_bytes = new.encode('utf-8')
+        if reverse:
+            old_bytes, new_bytes = new_bytes, old_bytes
+            offset += shift
+            shift += len(old_bytes) - len(new_bytes)
+
+        if data[offset:offset + len(old_bytes)] != old_bytes:
+            raise ValueError(f"expected {old_bytes!r} at byte {offset}")
+
+        parts.append(data[last:offset])
+        parts.append(new_bytes)
+        last = offset + len(old_bytes)
+
+    parts.append(data[last:])
+    return b''.join(parts)
+
+def write_plan(website_path, html_files, plan_path):
+    """Record every intended replacement in a change set file (nothing is written)"""
+    files = []
+    total = 0
+    for html_file in html_files:
+        rel_path = html_file.relative_to(website_path).as_posix()
+        try:
+            entry = plan_file(html_file, rel_path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error planning {rel_path}: {e}")
+            continue
+        if entry:
+            files.append(entry)
+            total += len(entry['edits'])
+            print(f"[PLAN] {rel_path}: {len(entry['edits'])} replacements")
+
+    with open(plan_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CHANGE_SET_VERSION, 'files': files}, f, separators=(',', ':'), ensure_ascii=False)
+
+    print("-" * 80)
+    print(f"Planned {total} replacements in {len(files)} files")
+    print(f"Change set: {plan_path}")
+
+def apply_plan(website_path, plan_path, reverse=False):
+    """Apply (or revert) a change set straight from its byte offsets
+
+    Returns (replacements written, files written, paths skipped).
+    """
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+
+    action = 'Reverted' if reverse else 'Applied'
+    replacements = 0
+    done = 0
+    skipped = []
+    for entry in plan['files']:
+        filepath = website_path / entry['path']
+        expected = entry['applied_hash'] if reverse else entry['hash']
+        try:
+            with open(filepath, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            print(f"[SKIP] {entry['path']}: {e}")
+            skipped.append(entry['path'])
+            continue
+
+        if content_hash(data) != expected:
+            print(f"[SKIP] {entry['path']}: file changed since the plan was made")
+            skipped.append(entry['path'])
+            continue
+
+        try:
+            new_data = apply_edits(data, entry['edits'], reverse=reverse)
+        except ValueError as e:
+            print(f"[SKIP] {entry['path']}: {e}")
+            skipped.append(entry['path'])
+            continue
+
+        with open(filepath, 'wb') as f:
+            f.write(new_data)
+        replacements += len(entry['edits'])
+        done += 1
+
+    print("-" * 80)
+    print(f"{action} {replacements} replacements in {done} files")
+    if skipped:
+        print(f"Skipped {len(skipped)} files:")
+        for path in skipped:
+            print(f"  {path}")
+
+    return replacements, done, skipped
+
 def process_html_file(filepath):
     """Process a single HTML file"""
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        # Check if file contains "training"
-        if not re.search(r'\btraining\b', content, re.IGNORECASE):
-            return 0
-
-        # Replace training with resource/resources
-        new_content, count = replace_training_in_text(content)
+        # Replace training with resource/resources in text nodes only
+        new_content, count = replace_training_in_html(content)
 
         if count > 0:
             # Write back to file
@@ -139,19 +399,82 @@ def process_html_file(filepath):
         print(f"Error processing {filepath}: {e}")
         return 0
 
+def benchmark(website_dir, pattern='CSA_Unit_*.html', runs=3):
+    """Compare bytes scanned and runtime of raw vs. segmented matching (no writes)"""
+    paths = sorted(glob.glob(os.path.join(website_dir, pattern)))
+    pages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+
+    raw_bytes = sum(len(page.encode('utf-8')) for page in pages)
+    text_bytes = sum(
+        len(chunk.encode('utf-8'))
+        for page in pages for kind, chunk in iter_segments(page) if kind != 'markup'
+    )
+
+    def best_time(func):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            for page in pages:
+                func(page)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    raw_time = best_time(replace_training_in_text)
+    segmented_time = best_time(replace_training_in_html)
+
+    print(f"Benchmark over {len(pages)} pages matching {pattern} (best of {runs})")
+    print("-" * 80)
+    print(f"Bytes scanned:  raw {raw_bytes:>10,}  segmented {text_bytes:>10,}  "
+          f"({100 * (1 - text_bytes / raw_bytes):.1f}% less)")
+    print(f"Runtime:        raw {raw_time * 1000:>8.1f} ms  segmented {segmented_time * 1000:>8.1f} ms  "
+          f"({raw_time / segmented_time:.1f}x faster)")
+
 def main():
     """Main function to process all HTML files"""
-    website_path = Path(WEBSITE_DIR)
+    parser = argparse.ArgumentParser(description='Replace Training with Resource/Resources across HTML files')
+    parser.add_argument('--dir', default=WEBSITE_DIR, help='website directory')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--benchmark', action='store_true', help='benchmark matching on the CSA_Unit_* pages without writing')
+    mode.add_argument('--plan', metavar='CHANGESET', help='record intended replacements without writing')
+    mode.add_argument('--apply', metavar='CHANGESET', help='apply a recorded change set')
+    mode.add_argument('--revert', metavar='CHANGESET', help='undo an applied change set')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.dir)
+        return
+
+    website_path = Path(args.dir)
+
+    if args.apply or args.revert:
+        apply_plan(website_path, args.apply or args.revert, reverse=bool(args.revert))
+        return
     total_files = 0
     total_replacements = 0
     files_changed = []
 
     print("Starting Training to Resource replacement across all HTML files...")
-    print(f"Directory: {WEBSITE_DIR}")
+    print(f"Directory: {args.dir}")
     print("-" * 80)
 
-    # Walk through all HTML files
-    for html_file in website_path.rglob('*.html'):
+    # Walk through all HTML files, or only those changed since a revision
+    if args.since:
+        changed, _ = git_changes(args.since, args.dir)
+        html_files = sorted(website_path / p for p in changed if p.endswith('.html'))
+        print(f"Limiting to {len(html_files)} HTML files changed since {args.since}")
+    else:
+        html_files = website_path.rglob('*.html')
+
+    if args.plan:
+        html_files = [f for f in html_files if not any(excluded in f.parts for excluded in EXCLUDE_DIRS)]
+        write_plan(website_path, html_files, args.plan)
+        return
+
+    for html_file in html_files:
         # Skip excluded directories
         if any(excluded in html_file.parts for excluded in EXCLUDE_DIRS):
             continue
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Resource hints and page-weight budgets for LarkLabs.org
+Analyses the resources each page references, injects preconnect/preload hints
+into the <head> and fails the build when a page goes over its class budget
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from collapse_redirects import SITE_HOST, file_for_path, site_path
+from compress_assets import COMPRESS_EXTENSIONS, MINIFIER_VERSION
+from site_utils import (CACHE_DIR, add_since_argument, content_hash, format_bytes, git_changes,
+                        iter_publish_files, load_cache, page_class, save_cache)
+from update_seo import insert_into_head
+
+# Weight report written with --report (kept out of the publish root)
+REPORT_FILE = os.path.join(CACHE_DIR, 'page-weights.json')
+
+# Service worker whose EXTERNAL_CACHE lists the AI tool origins
+SERVICE_WORKER = 'sw.js'
+
+# Stylesheets preloaded on every page that uses them
+CRITICAL_CSS = ['/assets/css/critical.css']
+
+# More preconnects than this compete with the page's own requests
+MAX_PRECONNECTS = 4
+
+# Compressed bytes allowed per page (HTML plus local CSS, JS and images)
+WEIGHT_BUDGETS = {
+    'unit': 200 * 1024,
+    'blog': 150 * 1024,
+    'pages': 250 * 1024,
+    'exam-prep': 300 * 1024,
+    'tools': 1024 * 1024,
+    'other': 1024 * 1024,
+}
+
+# Viewport width assumed when picking a srcset candidate for the weight check
+VIEWPORT_WIDTH = 960
+
+# Bump when the analysis changes so cached results are recomputed
+ANALYSIS_VERSION = '1'
+
+EXTERNAL_CACHE = re.compile(r'EXTERNAL_CACHE\s*=\s*\[(.*?)\]', re.DOTALL)
+QUOTED = re.compile(r'["\']([^"\']+)["\']')
+SIZES_WIDTH = re.compile(r'(\d+)px\s*$')
+
+class ResourceParser(HTMLParser):
+    """Collect the resources and existing resource hints of a page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_head = True
+        self.head_closed = False
+        self.resources = []
+        self.hints = []
+
+    def add(self, kind, url, attrs):
+        url = (url or '').strip()
+        if url and not url.startswith(('data:', '#')):
+            self.resources.append([kind, url, self.in_head, 'crossorigin' in attrs])
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name.lower(): (value or '') for name, value in attrs}
+        if tag == 'body':
+            self.in_head = False
+        elif tag == 'link':
+            rel = attrs.get('rel', '').lower().split()
+            href = attrs.get('href', '').strip()
+            if 'stylesheet' in rel:
+                self.add('style', href, attrs)
+            for hint in ('preconnect', 'preload', 'dns-prefetch'):
+                if hint in rel and href:
+                    self.hints.append([hint, href])
+        elif tag == 'script' and attrs.get('src'):
+            self.add('script', attrs['src'], attrs)
+        elif tag == 'img':
+            self.add('image', srcset_candidate(attrs) or attrs.get('src'), attrs)
+        elif tag == 'iframe':
+            self.add('iframe', attrs.get('src'), attrs)
+        elif tag == 'a':
+            self.add('link', attrs.get('href'), attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.in_head = False
+            self.head_closed = True
+
+def load_external_origins(sw_path=SERVICE_WORKER):
+    """Return the origins listed in the service worker's EXTERNAL_CACHE"""
+    try:
+        with open(sw_path, 'r', encoding='utf-8') as f:
+            found = EXTERNAL_CACHE.search(f.read())
+    except OSError:
+        return set()
+    if not found:
+        return set()
+    return {origin_of(url) for url in QUOTED.findall(found.group(1))}
+
+def srcset_candidate(attrs):
+    """Return the srcset image a browser would pick at VIEWPORT_WIDTH, or None"""
+    candidates = []
+    for item in attrs.get('srcset', '').split(','):
+        parts = item.split()
+        if len(parts) == 2 and parts[1].endswith('w') and parts[1][:-1].isdigit():
+            candidates.append((int(parts[1][:-1]), parts[0]))
+    if not candidates:
+        return None
+
+    # The last sizes slot is the display width past every media condition
+    found = SIZES_WIDTH.search(attrs.get('sizes', ''))
+    width = min(int(found.group(1)), VIEWPORT_WIDTH) if found else VIEWPORT_WIDTH
+    candidates.sort()
+    for candidate_width, url in candidates:
+        if candidate_width >= width:
+            return url
+    return candidates[-1][1]
+
+def origin_of(url):
+    """Return scheme://host for an absolute or protocol-relative URL, or None"""
+    parts = urlsplit(url if not url.startswith('//') else 'https:' + url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return f'{parts.scheme}://{parts.netloc}'
+
+def analyze_page(job):
+    """Parse (or reuse) the resources of one page (runs in a worker process)"""
+    path, cached = job
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    digest = content_hash(data + ANALYSIS_VERSION.encode())
+    if cached and cached.get('hash') == digest:
+        return path, cached
+
+    parser = ResourceParser()
+    parser.feed(data.decode('utf-8', errors='replace'))
+    parser.close()
+    return path, {'hash': digest, 'has_head': parser.head_closed,
+                  'resources': parser.resources, 'hints': parser.hints}
+
+def plan_hints(page, analysis, external_origins):
+    """Return (new hint tags, unused preloads) for one analysed page"""
+    if not analysis['has_head']:
+        # Fragments and templates have no </head> to insert into
+        return [], []
+
+    resources = analysis['resources']
+    hinted = {kind: set() for kind in ('preconnect', 'preload', 'dns-prefetch')}
+    for kind, href in analysis['hints']:
+        hinted[kind].add(origin_of(href) if kind != 'preload' else site_path(page, href) or href)
+
+    # Origins the page loads from, then the AI tool origins it links to
+    origins = {}
+    for kind, url, _, crossorigin in resources:
+        origin = origin_of(url)
+        if not origin or urlsplit(origin).netloc == SITE_HOST:
+            continue
+        if kind in ('style', 'script', 'image', 'iframe'):
+            origins.setdefault(origin, crossorigin)
+    for kind, url, _, _ in resources:
+        origin = origin_of(url)
+        if kind == 'link' and origin in external_origins:
+            origins.setdefault(origin, False)
+
+    tags = []
+    slots = MAX_PRECONNECTS - len(hinted['preconnect'])
+    for origin, crossorigin in origins.items():
+        if origin in hinted['preconnect'] or slots <= 0:
+            continue
+        tags.append(f'<link rel="preconnect" href="{origin}"{" crossorigin" if crossorigin else ""}>')
+        slots -= 1
+
+    # Critical stylesheets, and stylesheets only discovered in the body
+    used = {}
+    for kind, url, in_head, _ in resources:
+        path = site_path(page, url)
+        if path:
+            used.setdefault(path, (kind, url, in_head))
+    for path, (kind, url, in_head) in used.items():
+        if kind != 'style' or path in hinted['preload']:
+            continue
+        if path in CRITICAL_CSS or not in_head:
+            tags.append(f'<link rel="preload" href="{url}" as="style">')
+
+    unused = sorted(path for path in hinted['preload'] if path not in used)
+    return tags, unused
+
+def transfer_size(path, compress_stats, sizes):
+    """Bytes a file costs on the wire: the compress_assets.py output when it is
+    current, otherwise gzip of the source (binary files count in full)"""
+    if path in sizes:
+        return sizes[path]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    if path.endswith(COMPRESS_EXTENSIONS):
+        stats = compress_stats.get(path)
+        if stats and stats['hash'] == content_hash(data + MINIFIER_VERSION.encode()):
+            size = stats['brotli'] or stats['gzip']
+        else:
+            size = len(gzip.compress(data, compresslevel=9, mtime=0))
+    else:
+        size = len(data)
+
+    sizes[path] = size
+    return size
+
+def local_file(page, url):
+    """Return the published file a page's URL points at, or None"""
+    path = site_path(page, url)
+    return file_for_path(path) if path else None
+
+def page_weight(page, analysis, compress_stats, sizes):
+    """Return (total bytes, {asset: bytes}) for a page and its local subresources"""
+    assets = {}
+    for kind, url, _, _ in analysis['resources']:
+        if kind not in ('style', 'script', 'image'):
+            continue
+        asset = local_file(page, url)
+        if asset and asset not in assets:
+            assets[asset] = transfer_size(asset, compress_stats, sizes)
+    total = transfer_size(page, compress_stats, sizes) + sum(assets.values())
+    return total, assets
+
+def inject_hints(page, tags):
+    """Insert hint tags before </head>, returns True when the page changed"""
+    with open(page, 'r', encoding='utf-8') as f:
+        content = f.read()
+    new_content = insert_into_head(content, ''.join(f'    {tag}\n' for tag in tags))
+    if new_content == content:
+        return False
+    with open(page, 'w', encoding='utf-8') as f:
+        f.write(new_content)
+    return True
+
+def main():
+    """Inject resource hints and check page-weight budgets"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='report hints without editing pages')
+    parser.add_argument('--report', metavar='FILE', nargs='?', const=REPORT_FILE,
+                        help=f'write page weights as JSON (default: {REPORT_FILE})')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    cache = load_cache('resource_hints')
+    pages = list(iter_publish_files('.', ('.html',)))
+
+    if args.since:
+        # Changed pages, plus pages whose cached analysis references a changed asset
+        changed, _ = git_changes(args.since)
+        pages = [
+            p for p in pages
+            if p in changed or p not in cache
+            or any(local_file(p, r[1]) in changed for r in cache[p]['resources'])
+        ]
+
+    external_origins = load_external_origins()
+    print(f"Analysing resources of {len(pages)} pages...")
+    print("-" * 80)
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        analyses = dict(executor.map(analyze_page, [(p, cache.get(p)) for p in pages], chunksize=8))
+
+    hinted_pages = 0
+    for page, analysis in analyses.items():
+        tags, unused = plan_hints(page, analysis, external_origins)
+        for path in unused:
+            print(f"[WARN] {page}: preload of {path} is never used by the page")
+        if not tags:
+            continue
+        hinted_pages += 1
+        for tag in tags:
+            print(f"[OK] {page}: {tag}")
+        if not args.dry_run and inject_hints(page, tags):
+            # Re-analyse so the weight check and cache see the edited page
+            analyses[page] = analyze_page((page, None))[1]
+
+    cache.update(analyses)
+    save_cache('resource_hints', cache)
+
+    compress_stats = load_cache('compress')
+    sizes = {}
+    weights = {}
+    over_budget = []
+    for page, analysis in analyses.items():
+        total, assets = page_weight(page, analysis, compress_stats, sizes)
+        name = page_class(page)
+        budget = WEIGHT_BUDGETS.get(name)
+        weights[page] = {'class': name, 'bytes': total, 'budget': budget, 'assets': assets}
+        if budget is not None and total > budget:
+            over_budget.append(page)
+
+    if args.report:
+        os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(weights, f, indent=2)
+
+    print("-" * 80)
+    action = 'Would add' if args.dry_run else 'Added'
+    print(f"{action} resource hints to {hinted_pages} pages")
+    print()
+
+    classes = {}
+    for page, weight in weights.items():
+        classes.setdefault(weight['class'], []).append(weight['bytes'])
+    print(f"{'Class':<10} {'Pages':>5} {'Median':>10} {'Largest':>10} {'Budget':>10} {'Over':>5}")
+    for name, totals in sorted(classes.items()):
+        totals.sort()
+        budget = WEIGHT_BUDGETS.get(name)
+        over = sum(1 for p in over_budget if weights[p]['class'] == name)
+        print(f"{name:<10} {len(totals):>5} {format_bytes(totals[len(totals) // 2]):>10} "
+              f"{format_bytes(totals[-1]):>10} {format_bytes(budget) if budget else '-':>10} {over:>5}")
+
+    if over_budget:
+        print()
+        for page in sorted(over_budget, key=lambda p: weights[p]['bytes'], reverse=True):
+            weight = weights[page]
+            print(f"[FAIL] {page}: {format_bytes(weight['bytes'])} over the "
+                  f"{format_bytes(weight['budget'])} {weight['class']} budget")
+        sys.exit(f"ERROR: {len(over_budget)} pages over their weight budget")
+
+if __name__ == "__main__":
+    main()
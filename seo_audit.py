@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Site-wide SEO audit for LarkLabs.org
+Scans the <head> of every published page in parallel, caching results by content
+hash, and writes a machine-readable report that update_seo.py can apply
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+from find_duplicates import load_duplicates
+from site_utils import (CACHE_DIR, add_since_argument, content_hash, git_changes,
+                        is_verification_file, iter_publish_files, load_cache, page_url, save_cache)
+
+# Report consumed by update_seo.py --from-audit (kept out of the publish root)
+AUDIT_FILE = os.path.join(CACHE_DIR, 'seo-audit.json')
+
+# Length limits before search engines truncate
+MAX_TITLE_LENGTH = 60
+MIN_DESCRIPTION_LENGTH = 50
+MAX_DESCRIPTION_LENGTH = 160
+
+# Bump when checks change so cached results are recomputed
+AUDIT_VERSION = '1'
+
+# Bytes read at a time while looking for </head>
+READ_CHUNK = 8192
+
+class HeadParser(HTMLParser):
+    """Collect the title, meta description and canonical link from a <head>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.description = None
+        self.canonical = None
+        self.robots = None
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name.lower(): (value or '') for name, value in attrs}
+        if tag == 'title':
+            self._in_title = True
+            self.title = ''
+        elif tag == 'meta' and attrs.get('name', '').lower() == 'description':
+            self.description = attrs.get('content', '').strip()
+        elif tag == 'meta' and attrs.get('name', '').lower() == 'robots':
+            self.robots = attrs.get('content', '').lower()
+        elif tag == 'link' and 'canonical' in attrs.get('rel', '').lower().split():
+            self.canonical = attrs.get('href', '').strip()
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+def read_head(path):
+    """Read a page only up to its closing </head> tag"""
+    chunks = []
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            # Join with the previous chunk so a tag split across reads is still found
+            tail = b''.join(chunks[-2:]).lower()
+            if b'</head>' in tail or b'<body' in tail:
+                break
+    head = b''.join(chunks)
+    end = head.lower().find(b'</head>')
+    return head[:end] if end >= 0 else head
+
+def check_page(head):
+    """Run the per-page checks on a parsed head, returns (fields, issues)"""
+    parser = HeadParser()
+    parser.feed(head.decode('utf-8', errors='replace'))
+    parser.close()
+
+    title = ' '.join(parser.title.split()) if parser.title is not None else None
+    fields = {
+        'title': title,
+        'description': parser.description,
+        'canonical': parser.canonical,
+        'noindex': bool(parser.robots and 'noindex' in parser.robots),
+    }
+
+    issues = []
+    if not title:
+        issues.append('missing-title')
+    elif len(title) > MAX_TITLE_LENGTH:
+        issues.append('title-too-long')
+
+    if not parser.description:
+        issues.append('missing-description')
+    elif len(parser.description) < MIN_DESCRIPTION_LENGTH:
+        issues.append('description-too-short')
+    elif len(parser.description) > MAX_DESCRIPTION_LENGTH:
+        issues.append('description-too-long')
+
+    if not parser.canonical:
+        issues.append('missing-canonical')
+
+    return fields, issues
+
+def audit_file(job):
+    """Audit one page, reusing the cached result when the content is unchanged"""
+    path, cached = job
+    stat = os.stat(path)
+
+    # Unchanged size and mtime (and the same checks): no need to read the file at all
+    if cached and cached.get('version') == AUDIT_VERSION and cached.get('size') == stat.st_size \
+            and cached.get('mtime') == stat.st_mtime:
+        return path, cached, True
+
+    with open(path, 'rb') as f:
+        digest = content_hash(f.read() + AUDIT_VERSION.encode())
+    if cached and cached.get('hash') == digest:
+        return path, dict(cached, version=AUDIT_VERSION, size=stat.st_size, mtime=stat.st_mtime), True
+
+    fields, issues = check_page(read_head(path))
+    result = dict(fields, issues=issues, hash=digest, version=AUDIT_VERSION,
+                  size=stat.st_size, mtime=stat.st_mtime)
+    return path, result, False
+
+def find_duplicate_values(results, field):
+    """Group pages that share the same title or description"""
+    groups = {}
+    for path, result in results.items():
+        value = result.get(field)
+        if value:
+            groups.setdefault(value, []).append(path)
+    return {value: sorted(paths) for value, paths in groups.items() if len(paths) > 1}
+
+def build_report(results):
+    """Assemble the machine-readable audit report"""
+    duplicate_titles = find_duplicate_values(results, 'title')
+    duplicate_descriptions = find_duplicate_values(results, 'description')
+
+    pages = {}
+    for path, result in sorted(results.items()):
+        issues = list(result['issues'])
+        if result.get('title') in duplicate_titles:
+            issues.append('duplicate-title')
+        if result.get('description') in duplicate_descriptions:
+            issues.append('duplicate-description')
+        pages[path] = {
+            'url': page_url(path),
+            'title': result.get('title'),
+            'description': result.get('description'),
+            'canonical': result.get('canonical'),
+            'noindex': result.get('noindex', False),
+            'issues': issues,
+        }
+
+    summary = {}
+    for page in pages.values():
+        for issue in page['issues']:
+            summary[issue] = summary.get(issue, 0) + 1
+
+    return {
+        'summary': dict(sorted(summary.items())),
+        'duplicate_titles': duplicate_titles,
+        'duplicate_descriptions': duplicate_descriptions,
+        'pages': pages,
+    }
+
+def main():
+    """Audit all published pages and write the report"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--out', default=AUDIT_FILE, help='report file')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    cache = load_cache('seo_audit')
+    duplicates = load_duplicates()
+    pages = [p for p in iter_publish_files('.', ('.html',))
+             if p not in duplicates and not is_verification_file(p)]
+
+    results = {}
+    if args.since:
+        # Unchanged pages are taken from the cache without touching the file
+        changed, _ = git_changes(args.since)
+        results = {p: cache[p] for p in pages
+                   if p not in changed and cache.get(p, {}).get('version') == AUDIT_VERSION}
+        pages = [p for p in pages if p not in results]
+
+    print(f"Auditing {len(pages)} pages...")
+
+    reused = len(results)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for path, result, was_cached in executor.map(audit_file, [(p, cache.get(p)) for p in pages], chunksize=16):
+            results[path] = result
+            reused += was_cached
+
+    save_cache('seo_audit', results)
+    report = build_report(results)
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"Audited {len(results) - reused} changed pages, {reused} from cache")
+    print("-" * 80)
+    for issue, count in report['summary'].items():
+        print(f"  {count:4d} - {issue}")
+    print("-" * 80)
+    print(f"Report: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Shared helpers for the LarkLabs.org build scripts
+Walks the publish set, classifies pages and keeps per-file hash caches
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from urllib.parse import quote
+
+# Subdirectories that are published alongside the root pages
+PUBLISH_DIRS = ['pages', 'tools', 'HVAC_Tools', 'assets', 'training', 'courses', 'Textbook', 'apps']
+
+# Directories inside the published ones that are never part of the site:
+# build output, function sources and the source trees of the bundled apps
+EXCLUDE_DIRS = {'node_modules', '.git', 'backups', '.build-cache', 'dist', '__pycache__', 'netlify',
+                'src', 'app', 'www', 'android', 'ios', 'gradle'}
+
+# Native app projects (Android/Capacitor) are never published, whatever their name
+APP_PROJECT_MARKERS = ('android', 'capacitor')
+
+# Search-engine ownership verification files, which must stay exactly as issued
+VERIFICATION_FILE = re.compile(r'^(?:google[0-9a-f]+|yandex_[0-9a-f]+|pinterest-[0-9a-f]+)\.html$|^BingSiteAuth\.xml$')
+
+# Production origin
+BASE_URL = 'https://larklabs.org'
+
+# Where per-script caches are kept between runs
+CACHE_DIR = '.build-cache'
+
+def is_excluded_dir(name):
+    """Check if a directory name is left out of the publish set"""
+    lowered = name.lower()
+    return (lowered in EXCLUDE_DIRS or name.startswith('.') or 'backup' in lowered
+            or any(marker in lowered for marker in APP_PROJECT_MARKERS))
+
+def is_excluded(path):
+    """Check if a path sits in an excluded or backup directory"""
+    parts = Path(path).parts[:-1]
+    return any(is_excluded_dir(part) for part in parts)
+
+def iter_publish_files(root='.', extensions=('.html',)):
+    """Yield relative POSIX paths of published files with the given extensions"""
+    root_path = Path(root)
+
+    # Root directory files
+    for file in sorted(root_path.iterdir()):
+        if file.is_file() and file.suffix.lower() in extensions:
+            yield file.name
+
+    # Published subdirectories
+    for directory in PUBLISH_DIRS:
+        base = root_path / directory
+        if not base.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(d for d in dirnames if not is_excluded_dir(d))
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in extensions:
+                    full = Path(dirpath) / name
+                    yield full.relative_to(root_path).as_posix()
+
+def is_verification_file(path):
+    """Check if a path is a search-engine verification stub"""
+    return bool(VERIFICATION_FILE.match(os.path.basename(path)))
+
+def add_since_argument(parser):
+    """Add the shared --since option to a script's argument parser"""
+    parser.add_argument('--since', metavar='REV',
+                        help='only process files changed, added or deleted since this git revision')
+
+def git_changes(since, root='.'):
+    """Return (changed, deleted) sets of paths changed since a git revision
+
+    Uses git's index and object hashes (git diff against the work tree plus
+    untracked files), so no file contents are read or hashed here. Paths are
+    relative to root.
+    """
+    def git(*args):
+        try:
+            result = subprocess.run(['git', *args], cwd=root, check=True,
+                                    capture_output=True, text=True, encoding='utf-8')
+        except (OSError, subprocess.CalledProcessError) as e:
+            detail = getattr(e, 'stderr', '') or str(e)
+            sys.exit(f"ERROR: git {args[0]} failed: {detail.strip()}")
+        return [item for item in result.stdout.split('\0') if item]
+
+    changed = set()
+    deleted = set()
+
+    entries = git('diff', '--name-status', '-z', '--no-renames', '--relative', since, '--')
+    for status, path in zip(entries[::2], entries[1::2]):
+        if status.startswith('D'):
+            deleted.add(path)
+        else:
+            changed.add(path)
+
+    changed.update(git('ls-files', '-z', '--others', '--exclude-standard'))
+    return changed, deleted
+
+def page_class(path):
+    """Group a page into a class used for size and timing reports"""
+    path = path.replace('\\', '/')
+    name = os.path.basename(path)
+
+    if name.startswith('CSA_Unit_'):
+        return 'unit'
+    if path.startswith('pages/blog/'):
+        return 'blog'
+    if path.startswith('pages/'):
+        return 'pages'
+    if name.startswith('tssa-g') or 'exam' in name.lower() or 'practice-tests' in name:
+        return 'exam-prep'
+    if path.startswith(('tools/', 'HVAC_Tools/')):
+        return 'tools'
+    if path.endswith('.css'):
+        return 'css'
+    if path.endswith('.js'):
+        return 'js'
+    return 'other'
+
+def page_url(path, base_url=BASE_URL):
+    """Return the public URL of a page (directory URL for index pages)"""
+    path = path.replace('\\', '/')
+    if path == 'index.html' or path.endswith('/index.html'):
+        path = path[:-len('index.html')]
+    return f"{base_url}/{quote(path, safe='/')}"
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of bytes or text"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def load_cache(name):
+    """Load a JSON cache from the build cache directory"""
+    cache_file = Path(CACHE_DIR) / f'{name}.json'
+    if not cache_file.exists():
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(name, data):
+    """Write a JSON cache to the build cache directory"""
+    Path(CACHE_DIR).mkdir(exist_ok=True)
+    cache_file = Path(CACHE_DIR) / f'{name}.json'
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+def format_bytes(size):
+    """Format a byte count for report output"""
+    for unit in ['B', 'KB', 'MB']:
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
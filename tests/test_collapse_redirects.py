@@ -0,0 +1,117 @@
+"""Tests for the netlify.toml redirect resolver in collapse_redirects.py"""
+
+import pytest
+
+from collapse_redirects import RedirectRule, load_rules, resolve, rewritten_url, site_path
+
+CONFIG = '''
+[[redirects]]
+  from = "http://larklabs.org/*"
+  to = "https://larklabs.org/:splat"
+  status = 301
+  force = true
+
+[[redirects]]
+  from = "/old"
+  to = "/middle"
+
+[[redirects]]
+  from = "/middle"
+  to = "/new.html"
+  status = 302
+
+[[redirects]]
+  from = "/units/:unit/review"
+  to = "/CSA_Unit_:unit_Chapter_Reviews.html"
+
+[[redirects]]
+  from = "/docs/*"
+  to = "/manual/:splat"
+
+[[redirects]]
+  from = "/shadowed.html"
+  to = "/new.html"
+
+[[redirects]]
+  from = "/forced.html"
+  to = "/new.html"
+  force = true
+
+[[redirects]]
+  from = "/api/*"
+  to = "/.netlify/functions/:splat"
+  status = 200
+
+[[redirects]]
+  from = "/vendor/*"
+  to = "https://example.com/:splat"
+  status = 200
+
+[[redirects]]
+  from = "/loop-a"
+  to = "/loop-b"
+
+[[redirects]]
+  from = "/loop-b"
+  to = "/loop-a"
+
+[[redirects]]
+  from = "/*"
+  to = "/index.html"
+  status = 200
+'''
+
+
+@pytest.fixture
+def site(tmp_path):
+    for path in ['index.html', 'new.html', 'shadowed.html', 'forced.html', 'manual/intro.html',
+                 'CSA_Unit_16_Chapter_Reviews.html', 'guides/index.html', 'CSA Unit 16.pdf']:
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text('x')
+    config = tmp_path / 'netlify.toml'
+    config.write_text(CONFIG)
+    return tmp_path, load_rules(str(config))
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/new.html', ('file', '/new.html', 0)),
+    ('/guides/', ('file', '/guides/', 0)),
+    ('/new', ('file', '/new', 0)),
+    ('/CSA%20Unit%2016.pdf', ('file', '/CSA%20Unit%2016.pdf', 0)),
+    ('/old', ('redirect', '/new.html', 2)),
+    ('/units/16/review', ('redirect', '/CSA_Unit_16_Chapter_Reviews.html', 1)),
+    ('/docs/intro.html', ('redirect', '/manual/intro.html', 1)),
+    ('/shadowed.html', ('file', '/shadowed.html', 0)),
+    ('/forced.html', ('redirect', '/new.html', 1)),
+    ('/api/chat', ('rewrite', '/.netlify/functions/chat', 0)),
+    ('/vendor/lib.js', ('proxy', 'https://example.com/lib.js', 0)),
+    ('/missing.html', ('catch-all', '/index.html', 0)),
+    ('/../etc/passwd', ('catch-all', '/index.html', 0)),
+])
+def test_resolve(site, path, expected):
+    root, rules = site
+    assert resolve(path, rules, str(root)) == expected
+
+
+def test_redirect_loop_is_reported(site):
+    root, rules = site
+    kind, _, _ = resolve('/loop-a', rules, str(root))
+    assert kind == 'loop'
+
+
+def test_origin_rules_never_match_site_paths():
+    rule = RedirectRule({'from': 'http://larklabs.org/*', 'to': 'https://larklabs.org/:splat'})
+    assert rule.match('/anything') is None
+
+
+def test_site_path_resolves_relative_and_skips_external():
+    assert site_path('pages/blog/a.html', '../payment/b.html?x=1') == '/pages/payment/b.html'
+    assert site_path('index.html', 'https://larklabs.org/tools/') == '/tools/'
+    assert site_path('index.html', 'https://example.com/') is None
+    assert site_path('index.html', 'mailto:info@larklabs.org') is None
+
+
+def test_rewritten_url_keeps_link_style():
+    assert rewritten_url('pages/a.html', '/old?q=1#top', '/new.html') == '/new.html?q=1#top'
+    assert rewritten_url('pages/a.html', '../old', '/new.html') == '../new.html'
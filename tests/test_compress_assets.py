@@ -0,0 +1,72 @@
+"""Tests for the minifier and publish-set rules used by compress_assets.py"""
+
+import os
+
+from compress_assets import minify_css, minify_html, minify_js, remove_stale_outputs
+from site_utils import iter_publish_files
+
+
+def test_css_drops_comments_and_whitespace():
+    css = "body {\n  color: red;\n  /* note */\n  margin: 0 auto;\n}\n"
+    assert minify_css(css) == "body{color:red;margin:0 auto}"
+
+
+def test_css_keeps_strings_verbatim():
+    css = 'a::after { content: "  /* not a comment */  "; }'
+    assert minify_css(css) == 'a::after{content:"  /* not a comment */  "}'
+
+
+def test_js_trims_lines():
+    assert minify_js("  var a = 1;\n\n    var b = 2;\n") == "var a = 1;\nvar b = 2;\n"
+
+
+def test_js_with_template_literal_is_untouched():
+    js = "const html = `\n    <p>  keep  </p>\n`;\n"
+    assert minify_js(js) == js.strip() + "\n"
+
+
+def test_html_collapses_text_whitespace():
+    html = "<p>\n    Hello    world\n</p>"
+    assert minify_html(html) == "<p>\nHello world\n</p>\n"
+
+
+def test_html_leaves_raw_elements_and_attributes_alone():
+    html = ('<pre>  a\n   b</pre><script>  if (a  >  b) {}</script>'
+            '<textarea>  x  </textarea><a title="two  spaces">x</a>')
+    assert minify_html(html) == html + "\n"
+
+
+def test_html_minifies_inline_style():
+    html = "<style>\n  p { color: red; }\n</style>"
+    assert minify_html(html) == "<style>p{color:red}</style>\n"
+
+
+def test_html_comments_dropped_unless_marked():
+    html = ("<!-- plain --><p>x</p>"
+            "<!-- SEO-OPTIMIZED UNIT HEADER SECTION -->"
+            "<!--[if IE]><p>old</p><![endif]-->")
+    assert minify_html(html) == ("<p>x</p><!-- SEO-OPTIMIZED UNIT HEADER SECTION -->"
+                                 "<!--[if IE]><p>old</p><![endif]-->\n")
+
+
+def test_publish_set_skips_app_sources(tmp_path):
+    for path in ['index.html', 'pages/a.html', 'apps/tool/index.html',
+                 'apps/tool/src/data/b.html', 'apps/Jack_Android/www/c.html',
+                 'apps/gas/app/src/main/assets/d.html', 'Separation/e.html',
+                 'pages/backups/f.html']:
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text('x')
+
+    assert list(iter_publish_files(tmp_path)) == [
+        'index.html', 'pages/a.html', 'apps/tool/index.html']
+
+
+def test_remove_stale_outputs(tmp_path):
+    for path in ['keep.html', 'keep.html.gz', 'old/gone.html']:
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text('x')
+
+    assert remove_stale_outputs(str(tmp_path), {'keep.html', 'keep.html.gz'}) == 1
+    assert sorted(os.listdir(tmp_path)) == ['keep.html', 'keep.html.gz']
@@ -0,0 +1,67 @@
+"""Tests for MinHash/LSH clustering and canonical ranking in find_duplicates.py"""
+
+import random
+
+from find_duplicates import (NUM_PERM, canonical_rank, find_clusters, minhash, page_words,
+                             shingles, similarity)
+from site_utils import page_url
+
+rng = random.Random(7)
+VOCABULARY = [f"word{i}" for i in range(500)]
+
+
+def page(words):
+    return '<html><body><p>' + ' '.join(words) + '</p><script>var ignored = 1;</script></body></html>'
+
+
+def signature(html):
+    return minhash(shingles(page_words(html)))
+
+
+BASE = [rng.choice(VOCABULARY) for _ in range(400)]
+NEAR_COPY = BASE[:395] + ['changed'] * 5
+UNRELATED = [rng.choice(VOCABULARY) for _ in range(400)]
+
+
+def test_page_words_skips_markup_and_scripts():
+    assert page_words('<p>Gas <b>Valve</b></p><script>x = 1</script>') == ['gas', 'valve']
+
+
+def test_signature_similarity_tracks_overlap():
+    assert similarity(signature(page(BASE)), signature(page(BASE))) == 1.0
+    assert similarity(signature(page(BASE)), signature(page(NEAR_COPY))) >= 0.85
+    assert similarity(signature(page(BASE)), signature(page(UNRELATED))) < 0.2
+    assert len(signature(page(BASE))) == NUM_PERM
+
+
+def test_near_copies_cluster_under_the_canonical_page():
+    signatures = {
+        'tools/calculator.html': signature(page(BASE)),
+        'tools/calculator_backup.html': signature(page(NEAR_COPY)),
+        'pages/other.html': signature(page(UNRELATED)),
+    }
+    clusters = find_clusters(signatures)
+    assert len(clusters) == 1
+    assert clusters[0]['canonical'] == 'tools/calculator.html'
+    assert clusters[0]['duplicates'] == ['tools/calculator_backup.html']
+
+
+def test_copy_markers_match_whole_name_tokens():
+    assert canonical_rank('g2-practice-tests.html') < canonical_rank('g2-practice-test.html')
+    assert canonical_rank('temperature.html') < canonical_rank('pages/a.html')
+    assert canonical_rank('index.html') < canonical_rank('index_backup.html')
+
+
+def test_live_pages_outrank_archived_and_spaced_copies():
+    live = 'courses/a2l/A2L_Safety_Course.html'
+    assert canonical_rank(live) < canonical_rank('archive/A2L_Safety_Course.html')
+    assert canonical_rank(live) < canonical_rank('archived/A2L_Safety_Course.html')
+    assert canonical_rank(live) < canonical_rank('AI for Coordinators Course/A2L_Safety_Course.html')
+    assert canonical_rank('apps/tools/x.html') < canonical_rank('archive/x.html')
+
+
+def test_page_url_encodes_paths():
+    assert page_url('CSA_Unit_4_&_4a_Chapter_Reviews.html') == \
+        'https://larklabs.org/CSA_Unit_4_%26_4a_Chapter_Reviews.html'
+    assert page_url('AI for Coordinators Course/index.html') == \
+        'https://larklabs.org/AI%20for%20Coordinators%20Course/'
@@ -0,0 +1,41 @@
+"""Tests for the <img> rewriting in optimize_images.py"""
+
+from optimize_images import rewrite_img_tag
+
+ENTRY = {
+    'width': 1120,
+    'height': 320,
+    'variants': [{'width': 480, 'format': 'webp', 'path': 'assets/images/responsive/logo-480w.webp'}],
+}
+
+
+def test_unsized_image_gets_intrinsic_size_and_full_width_sizes():
+    tag = rewrite_img_tag('index.html', '<img src="logo.png">', ENTRY, lazy=False)
+    assert 'width="1120" height="320"' in tag
+    assert 'sizes="100vw"' in tag
+
+
+def test_inline_style_size_is_kept():
+    tag = rewrite_img_tag('index.html', '<img src="logo.png" style="width: 50px; height: 50px">',
+                          ENTRY, lazy=False)
+    assert 'width="1120"' not in tag
+    assert 'sizes="50px"' in tag
+
+
+def test_max_width_style_skips_intrinsic_size():
+    tag = rewrite_img_tag('index.html', '<img src="logo.png" style="max-width: 150px;">',
+                          ENTRY, lazy=False)
+    assert 'height="320"' not in tag
+    assert 'sizes="150px"' in tag
+
+
+def test_height_only_style_scales_by_aspect_ratio():
+    tag = rewrite_img_tag('index.html', '<img src="logo.png" style="height: 80px; width: auto;">',
+                          ENTRY, lazy=False)
+    assert 'sizes="280px"' in tag
+
+
+def test_declared_width_attribute_drives_sizes():
+    tag = rewrite_img_tag('index.html', '<img src="logo.png" width="80" height="23">', ENTRY, lazy=True)
+    assert 'sizes="80px"' in tag
+    assert 'loading="lazy"' in tag
@@ -0,0 +1,58 @@
+"""Tests for the plan/apply/revert change sets in replace_training.py"""
+
+from replace_training import apply_plan, replace_training_in_html, write_plan
+
+PAGE = ('<html><head><title>Gas Training</title></head>\n'
+        '<body><p>Free training for technicians. See the <a href="/training/g2/">Training</a> '
+        'pages and ‘training’ notes.</p>\n'
+        '<script>var url = "/training/";</script></body></html>\n')
+
+
+def make_site(tmp_path):
+    for name in ('a.html', 'b.html'):
+        (tmp_path / name).write_bytes(PAGE.encode('utf-8'))
+    return sorted(tmp_path.glob('*.html'))
+
+
+def test_plan_then_apply_matches_in_place_replacement(tmp_path):
+    files = make_site(tmp_path)
+    plan = tmp_path / 'plan.json'
+    write_plan(tmp_path, files, plan)
+
+    # Planning writes nothing
+    assert (tmp_path / 'a.html').read_text(encoding='utf-8') == PAGE
+
+    expected, count = replace_training_in_html(PAGE)
+    assert count >= 3
+    assert apply_plan(tmp_path, plan) == (2 * count, 2, [])
+    for path in files:
+        assert path.read_text(encoding='utf-8') == expected
+    assert '/training/' in expected
+
+
+def test_revert_restores_original_bytes(tmp_path):
+    files = make_site(tmp_path)
+    plan = tmp_path / 'plan.json'
+    write_plan(tmp_path, files, plan)
+    apply_plan(tmp_path, plan)
+
+    replacements, done, skipped = apply_plan(tmp_path, plan, reverse=True)
+    assert done == 2 and not skipped
+    for path in files:
+        assert path.read_text(encoding='utf-8') == PAGE
+
+
+def test_changed_file_is_skipped_and_not_counted(tmp_path, capsys):
+    files = make_site(tmp_path)
+    plan = tmp_path / 'plan.json'
+    write_plan(tmp_path, files, plan)
+    edited = PAGE.replace('Gas', 'Propane')
+    files[1].write_text(edited, encoding='utf-8')
+
+    _, count = replace_training_in_html(PAGE)
+    assert apply_plan(tmp_path, plan) == (count, 1, ['b.html'])
+    assert files[1].read_text(encoding='utf-8') == edited
+
+    output = capsys.readouterr().out
+    assert f"Applied {count} replacements in 1 files" in output
+    assert "Skipped 1 files:" in output
@@ -1,12 +1,21 @@
 """
 SEO Optimization Script for LarkLabs.org
 Updates AI tool pages with proper SEO tags and changes Mike Kapin to LARK Labs
+Run with --from-audit .build-cache/seo-audit.json to bulk-fix pages flagged by seo_audit.py
 """
 
+import argparse
+import html
+import json
 import os
 import re
 from pathlib import Path
 
+from site_utils import add_since_argument, git_changes, is_verification_file, iter_publish_files
+
+# Longest generated meta description
+MAX_DESCRIPTION_LENGTH = 155
+
 def update_homepage():
     """Update homepage with AI tools section and enhanced SEO"""
     file_path = "index.html"
@@ -231,17 +240,138 @@ def update_g2_simulator():
 
     print("DONE: Updated G2 Simulator page")
 
+# Pages with a dedicated updater, in the order they are run
+PAGE_UPDATES = [
+    ("index.html", update_homepage),
+    ("canadian-gas-technician-ai-tutor.html", update_gas_tech_tutor),
+    ("hvac-jack-40.html", update_hvac_jack),
+    ("code-compass.html", update_code_compass),
+    ("g3-practice-tests.html", update_g3_simulator),
+    ("g2-practice-tests.html", update_g2_simulator),
+]
+
+def insert_into_head(content, markup):
+    """Insert tags just before </head>, returns the content unchanged if there is none"""
+    head_tag = content.find('</head>')
+    if head_tag > 0:
+        content = content[:head_tag] + markup + content[head_tag:]
+    return content
+
+def first_paragraph_text(content):
+    """Return the first non-trivial paragraph of a page as plain text"""
+    for match in re.finditer(r'<p\b[^>]*>(.*?)</p>', content, re.DOTALL | re.IGNORECASE):
+        text = html.unescape(re.sub(r'<[^>]+>', ' ', match.group(1)))
+        text = ' '.join(text.split())
+        if len(text) >= 50:
+            return text
+    return None
+
+def summarize(text):
+    """Trim text to a meta description length on a word boundary"""
+    if len(text) <= MAX_DESCRIPTION_LENGTH:
+        return text
+    return text[:MAX_DESCRIPTION_LENGTH - 3].rsplit(' ', 1)[0].rstrip(',;:') + '...'
+
+def fix_page_from_audit(file_path, page):
+    """Apply the automatic fixes for one audited page, returns the fixes applied"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    fixes = []
+    issues = page['issues']
+
+    # Add canonical link
+    if 'missing-canonical' in issues and not page.get('noindex') and 'rel="canonical"' not in content:
+        new_content = insert_into_head(content, f'    <link rel="canonical" href="{page["url"]}">\n')
+        if new_content != content:
+            content = new_content
+            fixes.append('canonical')
+
+    # Add meta description from the page's opening paragraph
+    if 'missing-description' in issues and 'name="description"' not in content:
+        text = first_paragraph_text(content)
+        if text:
+            description = html.escape(summarize(text), quote=True)
+            new_content = insert_into_head(content, f'    <meta name="description" content="{description}">\n')
+            if new_content != content:
+                content = new_content
+                fixes.append('description')
+
+    if fixes:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    return fixes
+
+def apply_audit(report_path, only=None):
+    """Bulk-fix pages listed in a seo_audit.py report (optionally only some paths)"""
+    with open(report_path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+
+    print(f"Applying fixes from {report_path}...")
+    print()
+
+    # Reports can be stale or hand-edited; never touch files outside the publish set
+    published = set(iter_publish_files('.', ('.html',)))
+
+    fixed_pages = 0
+    unpublished = 0
+    manual = {}
+    for file_path, page in report['pages'].items():
+        if only is not None and file_path not in only:
+            continue
+        if file_path not in published:
+            unpublished += 1
+            continue
+        # Verification stubs must stay exactly as the search engine issued them
+        if is_verification_file(file_path):
+            continue
+        if not os.path.exists(file_path):
+            print(f"WARNING: {file_path} not found")
+            continue
+
+        fixes = fix_page_from_audit(file_path, page)
+        if fixes:
+            fixed_pages += 1
+            print(f"DONE: {file_path}: added {', '.join(fixes)}")
+
+        # Titles and duplicates need a human to rewrite them
+        for issue in page['issues']:
+            if issue.startswith(('title-', 'duplicate-', 'description-', 'missing-title')):
+                manual[issue] = manual.get(issue, 0) + 1
+
+    print()
+    print(f"Fixed {fixed_pages} pages")
+    if unpublished:
+        print(f"Skipped {unpublished} pages outside the publish set")
+    if manual:
+        print("Needs manual review:")
+        for issue, count in sorted(manual.items()):
+            print(f"  {count:4d} - {issue}")
+
 def main():
     """Run all updates"""
+    parser = argparse.ArgumentParser(description='SEO Optimization Script for LarkLabs.org')
+    parser.add_argument('--from-audit', metavar='REPORT', help='apply fixes from a seo_audit.py report')
+    add_since_argument(parser)
+    args = parser.parse_args()
+
+    changed = None
+    if args.since:
+        changed, _ = git_changes(args.since)
+
+    if args.from_audit:
+        apply_audit(args.from_audit, only=changed)
+        return
+
     print("Starting SEO optimization...")
     print()
 
-    update_homepage()
-    update_gas_tech_tutor()
-    update_hvac_jack()
-    update_code_compass()
-    update_g3_simulator()
-    update_g2_simulator()
+    for file_path, update in PAGE_UPDATES:
+        if changed is not None and file_path not in changed:
+            print(f"SKIP: {file_path} unchanged since {args.since}")
+            continue
+        update()
 
     print()
     print("All SEO updates complete!")